@@ -0,0 +1,96 @@
+"""Compares warm-start load time and memory of the bill cache formats.
+
+Each bill is loaded and classified, as `Files.process` does, so a memory-mapped
+cache is measured after classifying has added its own columns.
+
+Usage: python benchmarks/cache.py faturas/ [repeat]
+
+The bills and their parquet caches are copied to a temporary folder, where
+every format is converted from parquet, loaded once in a fresh process to
+warm the OS page cache, then loaded `repeat` more times to be measured.
+Bills without a parquet cache are left out. Memory is only measured where
+the `resource` module exists (not on Windows).
+"""
+import sys
+from datetime import datetime as date
+from pathlib import Path
+from shutil import copy
+from subprocess import run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from c6_credit_card.data.file import CACHES
+from c6_credit_card.data.files import Files, sources
+from c6_credit_card.data.mapping import Mapping
+from c6_credit_card.data.merchants import Merchants
+
+try:
+    from resource import RUSAGE_SELF, getrusage
+except ImportError:
+    getrusage = None
+
+
+def load(folder: str, cache: str) -> None:
+    before = maxrss()
+    start = perf_counter()
+    files = Files(folder, since=EPOCH, cache=cache)
+    mapping, merchants = Mapping(), Merchants()
+    merchants.invalidate(mapping)
+    for f in files:
+        f.load()
+        f.classify(mapping, merchants)
+    elapsed = perf_counter() - start
+    rows = sum(len(f._df) for f in files)
+    rss = (maxrss() - before) / 1024
+    print(f"{elapsed * 1000:.1f} {rss:.1f} {rows}")
+
+
+def main(folder: str, repeat: int = 5) -> None:
+    with TemporaryDirectory() as tmp:
+        for bill in sources(folder).values():
+            if not (cached := bill.with_suffix(".cache")).is_file():
+                print(f"Skipping {bill.name}, it has no parquet cache")
+                continue
+            copy(bill, tmp)
+            copy(cached, tmp)
+        if not any(Path(tmp).iterdir()):
+            sys.exit(f"No parquet caches found into {folder}, run c6_credit_card first")
+
+        print(f"{'cache':<12}{'load ms':>10}{'rss MiB':>10}{'disk KiB':>10}{'rows':>8}")
+        for cache, (suffix, _) in CACHES.items():
+            if suffix != ".cache":
+                for path in Path(tmp).glob(f"*{suffix}"):
+                    path.unlink()
+            child(tmp, cache)
+            runs = [child(tmp, cache) for _ in range(repeat)]
+            elapsed = min(r[0] for r in runs)
+            rss = min(r[1] for r in runs)
+            disk = sum(p.stat().st_size for p in Path(tmp).glob(f"*{suffix}"))
+            rows = runs[0][2]
+            print(f"{cache:<12}{elapsed:>10.1f}{rss:>10.1f}{disk / 1024:>10.0f}{rows:>8}")
+
+
+def maxrss() -> float:
+    # KiB on Linux; memory is reported as nan where it cannot be measured
+    return getrusage(RUSAGE_SELF).ru_maxrss if getrusage else float("nan")
+
+
+def child(folder: str, cache: str) -> tuple[float, float, int]:
+    output = run(
+        [sys.executable, __file__, "--child", folder, cache],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    elapsed, rss, rows = output.split()
+    return float(elapsed), float(rss), int(rows)
+
+
+EPOCH = date(1900, 1, 1)
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--child":
+        load(sys.argv[2], sys.argv[3])
+    else:
+        main(sys.argv[1], *map(int, sys.argv[2:]))
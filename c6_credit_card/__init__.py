@@ -1,3 +1,11 @@
-from .data import File, Files
-
 __all__ = ['File', 'Files']
+
+
+def __getattr__(name):
+    # pandas and pyarrow are only imported once the bills are needed, so the
+    # daemon client starts without them
+    if name in __all__:
+        from . import data
+
+        return getattr(data, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,6 @@
+from glob import glob
 from logging import DEBUG, INFO, basicConfig, getLogger
+from os import environ, getenv
 from pathlib import Path
 from warnings import filterwarnings
 
@@ -7,26 +9,93 @@ from dotenv import load_dotenv
 from rich.console import Console
 from rich.logging import RichHandler
 
-from c6_credit_card.output import display_terminal_output, generate_html_output
-from c6_credit_card.services import (
-    plot_data_total,
-    plot_data_type,
-    plot_next_months,
-    read_files,
-)
+from c6_credit_card.daemon import Client, Daemon, connect, socket_path
+
+# pandas, pyarrow, tabula and plotly are imported where they are used, so
+# explore and exec reach a running daemon without loading them. The choices
+# below mirror data.file.CACHES, data.readers.EXTRACTORS, output.ASSETS and
+# services.MAX_POINTS for the same reason.
+CACHES = ["parquet", "feather", "feather-lz4"]
+EXTRACTORS = ["tabula", "text", "recorded"]
+ASSETS = ["cdn", "shared", "inline"]
+MAX_POINTS = 500
 
 filterwarnings(action="ignore", category=UserWarning)
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option(
     "--pasta",
     "-p",
     help="Pasta com arquivos das faturas",
     prompt="Pasta com arquivos das faturas",
 )
+@click.option(
+    "--card",
+    "-c",
+    "cards",
+    multiple=True,
+    callback=lambda ctx, param, value: parse_cards(value),
+    help="Bills of one card as LABEL=PASTA, or a glob of folders named after "
+    "their card; the cache stays in --pasta (repeatable).",
+)
 @click.option("--verbose", "-v", is_flag=True, help="Print more output.")
 @click.option("--force", "-f", is_flag=True, help="Force extract.")
+@click.option(
+    "--extractor",
+    "-e",
+    type=click.Choice(EXTRACTORS),
+    default="tabula",
+    help="How tables are extracted from PDF bills.",
+)
+@click.option(
+    "--mapping",
+    "-m",
+    "mappings",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Extra mapping file over the package, user and folder ones (repeatable).",
+)
+@click.option(
+    "--cache",
+    type=click.Choice(CACHES),
+    default="parquet",
+    help="Format of the extracted bills cache.",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(["%Y-%m"]),
+    help="First bill month (YYYY-MM), defaults to 11 months before --until.",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(["%Y-%m"]),
+    help="Last bill month (YYYY-MM), defaults to the newest bill.",
+)
+@click.option(
+    "--all-months",
+    is_flag=True,
+    help="Also write report-YYYY-MM.html for every month read.",
+)
+@click.option(
+    "--transactions",
+    is_flag=True,
+    help="List every transaction read in a table sorted and paged by the browser.",
+)
+@click.option(
+    "--max-points",
+    type=click.IntRange(min=3),
+    default=MAX_POINTS,
+    show_default=True,
+    help="Most points drawn by the daily spending chart, downsampled above it.",
+)
+@click.option(
+    "--assets",
+    type=click.Choice(ASSETS),
+    default="cdn",
+    help="Load plotly.js and the CSS from its CDN, from a shared assets/ folder "
+    "next to the reports, or inline them in each report.",
+)
 @click.option(
     "--output-format",
     "-o",
@@ -34,54 +103,219 @@ filterwarnings(action="ignore", category=UserWarning)
     default="html",
     help="Output format.",
 )
-def main(pasta, verbose, force, output_format):
+@click.pass_context
+def main(
+    ctx,
+    pasta,
+    cards,
+    verbose,
+    force,
+    extractor,
+    mappings,
+    cache,
+    since,
+    until,
+    all_months,
+    transactions,
+    max_points,
+    assets,
+    output_format,
+):
     """Explore credit card bills from C6 in terminal."""
     setup(verbose)
+    ctx.obj = {
+        "pasta": pasta,
+        "force": force,
+        "extractor": extractor,
+        "since": since,
+        "until": until,
+        "cache": cache,
+        "mappings": mappings,
+        "cards": cards,
+    }
+    if ctx.invoked_subcommand is not None:
+        return
+
+    from c6_credit_card.output import write_assets
+    from c6_credit_card.services import read_files
+
     LOG.info(f"Output format selected: {output_format}")
-    files = read_files(pasta, force)
-    file = files[-1]
+    files = read_files(**ctx.obj)
+    if assets == "shared" and (output_format == "html" or all_months):
+        write_assets(Path("."))
+    options = {"assets": assets, "history": transactions, "max_points": max_points}
+    report(files, output_format, Path("report.html"), **options)
+    if len(files.cards) > 1:
+        for card, view in files.by_card().items():
+            report(view, output_format, Path(f"report-{card}.html"), **options)
+    if all_months:
+        # Every month is a view of the bills loaded once, rendered in turn
+        for count, view in enumerate(files.history(), 1):
+            output = Path(f"report-{view[-1].month:%Y-%m}.html")
+            report(view, "html", output, **options)
+        LOG.info(f"{count} monthly reports written")
 
-    LOG.info(f"using {file}")
 
-    # Generate all plot data by calling service functions
-    ys_next_months, xs_next_months = plot_next_months(file)
-    ys_data_total, xs_data_total = plot_data_total(files)
-    ys_data_type, xs_data_type, tps_data_type = plot_data_type(files)
-    # plot_gastos_por_dia_data = plot_gastos_por_dia(file) # If needed for output functions
+def report(
+    files,
+    output_format,
+    output: Path,
+    assets="cdn",
+    history=False,
+    max_points=MAX_POINTS,
+):
+    from c6_credit_card.output import display_terminal_output, generate_html_output
+    from c6_credit_card.services import report_data
 
-    # The plotting and Rich summary display are now handled by the output functions.
-    # Removed direct plot() calls and Rich Panel rendering from here.
+    LOG.info(f"using {files[-1]}")
 
     if output_format == "terminal":
-        display_terminal_output(
-            CONSOLE=Console(),
-            file=file,
-            ys_next_months=ys_next_months,
-            xs_next_months=xs_next_months,
-            ys_data_total=ys_data_total,
-            xs_data_total=xs_data_total,
-            ys_data_type=ys_data_type,
-            xs_data_type=xs_data_type,
-            tps_data_type=tps_data_type,
-            # plot_gastos_por_dia_data=plot_gastos_por_dia_data, # Pass if used
-        )
+        data = report_data(files, max_points=max_points, html=False)
+        display_terminal_output(CONSOLE=Console(), **data)
     elif output_format == "html":
-        html_content = generate_html_output(
-            file=file,
-            ys_next_months=ys_next_months,
-            xs_next_months=xs_next_months,
-            ys_data_total=ys_data_total,
-            xs_data_total=xs_data_total,
-            ys_data_type=ys_data_type,
-            xs_data_type=xs_data_type,
-            tps_data_type=tps_data_type,
-            # plot_gastos_por_dia_data=plot_gastos_por_dia_data, # Pass if used
-        )
-        Path("report.html").write_text(html_content)
+        data = report_data(files, history, max_points)
+        html_content = generate_html_output(**data, assets=assets)
+        output.write_text(html_content)
     else:
         LOG.error(f"Unknown output format: {output_format}")
 
 
+@main.command()
+@click.option(
+    "--local", "-l", multiple=True, help="Merchant name substring (repeatable)."
+)
+@click.option("--since", type=click.DateTime(["%Y-%m"]), help="First month (YYYY-MM).")
+@click.option("--until", type=click.DateTime(["%Y-%m"]), help="Last month (YYYY-MM).")
+@click.option("--min", "min_value", type=float, help="Minimum value.")
+@click.option("--max", "max_value", type=float, help="Maximum value.")
+@click.option(
+    "--by",
+    "-b",
+    multiple=True,
+    type=click.Choice(["month", "data", "local", "card"]),
+    help="Group by (repeatable).",
+)
+@click.option("--top", "-t", type=int, help="Show only the N largest.")
+@click.option("--csv", "as_csv", is_flag=True, help="Output as CSV.")
+@click.pass_obj
+def query(obj, local, since, until, min_value, max_value, by, top, as_csv):
+    """Ad-hoc query over the cached bills.
+
+    Example: -p faturas query -l ifood --since 2024-01 --until 2024-12 --min 100
+    """
+    from pyarrow import BufferOutputStream
+    from pyarrow.csv import write_csv
+
+    from c6_credit_card.data.query import query as query_files
+    from c6_credit_card.data.rich_pandas import arrow_to_table
+
+    since, until = since or obj["since"], until or obj["until"]
+    table = query_files(
+        obj["pasta"], local, since, until, min_value, max_value, by, top, obj["cards"]
+    )
+
+    if as_csv:
+        sink = BufferOutputStream()
+        write_csv(table, sink)
+        click.echo(sink.getvalue().to_pybytes().decode(), nl=False)
+    else:
+        Console().print(arrow_to_table(table, title=f"{table.num_rows} linhas"))
+
+
+@main.command()
+@click.pass_obj
+def explore(obj):
+    """Interactive session that keeps the bills loaded in memory."""
+    client = connect(obj["pasta"])
+    if client is not None:
+        LOG.info("Using the running daemon")
+        CONSOLE.print(Client.intro)
+        stop = False
+        while not stop:
+            try:
+                line = input(Client.prompt)
+            except EOFError:
+                line = "quit"
+            output, stop = client.send(line, CONSOLE.width)
+            CONSOLE.file.write(output)
+        client.close()
+        return
+
+    from c6_credit_card.explorer import Explorer
+    from c6_credit_card.services import read_files
+
+    files = read_files(**obj)
+    Explorer(
+        files, load=lambda: read_files(**{**obj, "force": False})
+    ).cmdloop()
+
+
+@main.command(name="exec")
+@click.argument("command", nargs=-1, required=True)
+@click.pass_obj
+def exec_(obj, command):
+    """Run a single explorer command, on the daemon when one is running."""
+    line = " ".join(command)
+    client = connect(obj["pasta"])
+    if client is not None:
+        output, _ = client.send(line, CONSOLE.width)
+        CONSOLE.file.write(output)
+        client.close()
+        return
+
+    from c6_credit_card.explorer import Explorer
+    from c6_credit_card.services import read_files
+
+    files = read_files(**obj)
+    Explorer(files).onecmd(line)
+
+
+@main.command()
+@click.pass_obj
+def serve(obj):
+    """Keep the bills loaded in a local daemon used by explore and exec."""
+    from c6_credit_card.services import read_files
+
+    password = getenv("password") or click.prompt("Senha do arquivo", hide_input=True)
+    environ["password"] = password
+
+    files = read_files(**obj)
+    daemon = Daemon(
+        socket_path(obj["pasta"]),
+        files,
+        lambda: read_files(**{**obj, "force": False}),
+    )
+    daemon.serve()
+
+
+@main.command()
+@click.pass_obj
+def record(obj):
+    """Save the PDF tables of each bill to replay them with --extractor recorded."""
+    from c6_credit_card.data.files import sources
+    from c6_credit_card.data.readers import record_tables
+
+    if obj["extractor"] == "recorded":
+        raise click.UsageError("Record with the tabula or text extractor")
+    password = getenv("password") or click.prompt("Senha do arquivo", hide_input=True)
+
+    for pattern in (obj["cards"] or {None: obj["pasta"]}).values():
+        for bill in sources(pattern).values():
+            if bill.suffix == ".pdf":
+                LOG.info(f"Recorded {record_tables(bill, password, obj['extractor'])}")
+
+
+def parse_cards(specs) -> dict[str, str]:
+    cards = {}
+    for spec in specs:
+        if "=" in spec:
+            card, pattern = spec.split("=", 1)
+            cards[card] = pattern
+        else:
+            cards.update({Path(folder).name: folder for folder in sorted(glob(spec))})
+    return cards
+
+
 def setup(verbose):
     load_dotenv()
     level = DEBUG if verbose else INFO
@@ -94,6 +328,7 @@ def setup(verbose):
 
 
 LOG = getLogger(__name__)
+CONSOLE = Console()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+from hashlib import md5
+from io import StringIO
+from json import dumps, loads
+from logging import getLogger
+from os import getenv, getuid, umask
+from pathlib import Path
+from socket import AF_UNIX, SOCK_STREAM, socket
+from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+from tempfile import gettempdir
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from c6_credit_card.data.files import Files
+
+
+class Daemon(ThreadingMixIn, UnixStreamServer):
+    """Serves explorer commands over a local Unix socket.
+
+    The bills, the cube, the ledger and the extractor's JVM stay loaded in
+    this process, so each request only pays for the command itself. Every
+    connection has its own thread, so an open session does not keep others
+    waiting; their commands take turns on the shared bills.
+    """
+
+    daemon_threads = True
+    # Checks for a shutdown between connections
+    timeout = 0.5
+
+    def __init__(
+        self, path: Path, files: "Files", load: Callable[[], "Files"]
+    ) -> None:
+        self.path = Path(path)
+        self.files = files
+        self.load = load
+        self.lock = Lock()
+        self.stopping = False
+        if self.path.exists():
+            self.path.unlink()
+        # Only the owner may connect to the socket
+        mask = umask(0o177)
+        try:
+            super().__init__(str(self.path), Handler)
+        finally:
+            umask(mask)
+
+    def reload(self) -> "Files":
+        self.files = self.load()
+        return self.files
+
+    def serve(self) -> None:
+        LOG.info(f"Listening on {self.path}")
+        try:
+            while not self.stopping:
+                self.handle_request()
+        finally:
+            self.server_close()
+            self.path.unlink(missing_ok=True)
+            LOG.info("Daemon stopped")
+
+
+class Handler(StreamRequestHandler):
+    def handle(self):
+        from rich.console import Console
+
+        from c6_credit_card.explorer import Explorer
+
+        explorer = None
+        for line in self.rfile:
+            request = loads(line)
+            console = Console(
+                file=StringIO(),
+                width=request.get("width", 120),
+                record=True,
+                force_terminal=True,
+            )
+            if explorer is None:
+                explorer = Explorer(self.server.files, console, self.server.reload)
+            explorer.console = console
+
+            command = request["command"].strip()
+            stop = False
+            if command == "shutdown":
+                self.server.stopping = stop = True
+                console.print("Daemon stopping")
+            else:
+                with self.server.lock:
+                    stop = bool(explorer.onecmd(command))
+
+            response = {"output": console.export_text(styles=True), "stop": stop}
+            self.wfile.write((dumps(response) + "\n").encode())
+            if stop:
+                break
+
+
+class Client:
+    intro = "C6 credit card explorer. Type help or ? to list commands."
+    prompt = "c6> "
+
+    def __init__(self, path: Path) -> None:
+        self._socket = socket(AF_UNIX, SOCK_STREAM)
+        self._socket.connect(str(path))
+        self._file = self._socket.makefile("rwb")
+
+    def send(self, command: str, width: int = 120) -> tuple[str, bool]:
+        request = {"command": command, "width": width}
+        self._file.write((dumps(request) + "\n").encode())
+        self._file.flush()
+        response = loads(self._file.readline())
+        return response["output"], response["stop"]
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+
+def socket_path(folder: str) -> Path:
+    key = md5(str(Path(folder).resolve()).encode()).hexdigest()[:12]
+    return runtime_dir() / f"c6_credit_card-{key}.sock"
+
+
+def runtime_dir() -> Path:
+    """$XDG_RUNTIME_DIR, or a directory only the current user can enter."""
+    if runtime := getenv("XDG_RUNTIME_DIR"):
+        return Path(runtime)
+
+    folder = Path(gettempdir()) / f"c6_credit_card-{getuid()}"
+    folder.mkdir(mode=0o700, exist_ok=True)
+    stat = folder.lstat()
+    if folder.is_symlink() or stat.st_uid != getuid() or stat.st_mode & 0o077:
+        raise Exception(f'"{folder}" must be a directory only you can access')
+    return folder
+
+
+def connect(folder: str) -> Optional[Client]:
+    """Client for the daemon serving `folder`, or None when none is running."""
+    path = socket_path(folder)
+    try:
+        return Client(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        LOG.debug(f"No daemon listening on {path}")
+        return None
+
+
+LOG = getLogger(__name__)
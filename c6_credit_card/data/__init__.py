@@ -1,4 +1,5 @@
 from .files import Files
 from .file import File
+from .ledger import Ledger
 
-__all__ = ['Files', 'File']
+__all__ = ['Files', 'File', 'Ledger']
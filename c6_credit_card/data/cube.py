@@ -0,0 +1,111 @@
+from datetime import datetime as date
+from logging import getLogger
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+from .file import File
+
+
+class Cube:
+    """Count and total of every (month, card, type, local, segment) cell.
+
+    The cube is persisted next to the bills and each bill replaces the cells
+    of its month and cards when it is ingested, so trend views are rolled up from it without
+    touching transaction-level data.
+    """
+
+    def __init__(self, file: Optional[Path] = None) -> None:
+        self.file = file
+        self._df = pd.DataFrame(columns=DIMENSIONS + MEASURES).astype(DTYPES)
+        if file is not None and Path(file).is_file():
+            LOG.debug(f"Reading cube from {file}")
+            cells = pd.read_parquet(file)
+            # Cubes saved before cards were tracked are rebuilt on ingestion
+            if "card" in cells:
+                self._df = cells
+
+    def ingest(self, file: File) -> None:
+        cells = _cells(file._df.assign(segment=file.segment()), file.month)
+        # Only the cards of this bill are replaced, others keep their last run
+        cards = [bill.card for bill in file.bills]
+        month = self._df["month"].eq(pd.Timestamp(file.month))
+        kept = self._df[~(month & self._df["card"].isin(cards))]
+        self._df = pd.concat([kept, cells], ignore_index=True)
+
+    def patch(self, month: date, before: pd.DataFrame, after: pd.DataFrame) -> None:
+        """Moves rows of one bill from their previous cells to their new ones."""
+        removed = _cells(before, month)
+        removed[MEASURES] = -removed[MEASURES]
+        cells = (
+            pd.concat([self._df, removed, _cells(after, month)], ignore_index=True)
+            .groupby(DIMENSIONS, sort=False)[MEASURES]
+            .sum()
+            .reset_index()
+        )
+        self._df = cells[cells["qtd"] > 0].astype(DTYPES).reset_index(drop=True)
+
+    def rollup(
+        self,
+        by: Union[str, list[str], None] = None,
+        months: Optional[Iterable[date]] = None,
+        cards: Optional[Iterable[str]] = None,
+    ) -> pd.DataFrame:
+        data = self._df
+        if months is not None:
+            data = data[data["month"].isin(pd.to_datetime(list(months)))]
+        if cards is not None:
+            data = data[data["card"].isin(list(cards))]
+
+        if not by:
+            return data[MEASURES].sum().to_frame().T.round(2)
+
+        by = [by] if isinstance(by, str) else by
+        return (
+            data.groupby(by)[MEASURES]
+            .sum()
+            .sort_values("tot_value", ascending=False)
+            .round(2)
+            .reset_index()
+        )
+
+    @property
+    def months(self) -> list[date]:
+        return sorted(self._df["month"].unique())
+
+    def save(self) -> None:
+        if self.file is None:
+            return
+        LOG.debug(f"Saving cube to {self.file}")
+        self._df.to_parquet(self.file)
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    def __repr__(self) -> str:
+        return f"Cube(months={len(self.months)}, cells={len(self)})"
+
+
+def _cells(data: pd.DataFrame, month: date) -> pd.DataFrame:
+    return (
+        data.assign(month=month)
+        .groupby(DIMENSIONS, sort=False)
+        .agg(qtd=("valor", "count"), tot_value=("valor", "sum"))
+        .reset_index()
+        .astype(DTYPES)
+    )
+
+
+DIMENSIONS = ["month", "card", "type", "local", "segment"]
+MEASURES = ["qtd", "tot_value"]
+DTYPES = {
+    "month": "datetime64[ns]",
+    "card": object,
+    "type": object,
+    "local": object,
+    "segment": object,
+    "qtd": int,
+    "tot_value": float,
+}
+LOG = getLogger(__name__)
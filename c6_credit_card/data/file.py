@@ -2,35 +2,126 @@ from collections import OrderedDict
 from datetime import datetime as date
 from logging import getLogger
 from pathlib import Path
-from typing import Optional, Union
+from typing import Iterable, Optional, Sequence, Union
 
+import numpy as np
 import pandas as pd
-from tabula.io import read_pdf
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from .mapping import Mapping
+from .merchants import Merchants
+from .readers import READERS
 from .result import Result
 
 
 class File:
-    def __init__(self, file: Path, month: date) -> None:
+    def __init__(
+        self, file: Path, month: date, cache: str = "parquet", card: str = ""
+    ) -> None:
+        if cache not in CACHES:
+            raise Exception(f'Unknown cache "{cache}", use {list(CACHES)}')
+
         self.file = file
         self.month = month
-        self.__cache_file = self.file.with_suffix(".cache")
+        self.cache = cache
+        self.card = card
+        # Bills of this month from every card, once joined into this one
+        self.bills = [self]
+        self.__cache_file = self.file.with_suffix(CACHES[cache][0])
 
     def process(
-        self, password: Optional[str] = None, mapping: Mapping = Mapping(), force=False
+        self,
+        password: Optional[str] = None,
+        mapping: Optional[Mapping] = None,
+        force=False,
+    ) -> None:
+        self.load(password, force)
+        self.classify(mapping)
+
+    def load(
+        self, password: Optional[str] = None, force=False, extractor: str = "tabula"
     ) -> None:
-        if Path(self.__cache_file).is_file() and not force:
-            LOG.debug(f"Reading from cache {self}")
-            self._df = pd.read_parquet(self.__cache_file)
+        cached = self._cached()
+        if cached is not None and not force:
+            LOG.debug(f"Reading from cache {cached}")
+            self._df = _read_cache(cached)
+            if cached != self.__cache_file:
+                LOG.debug(f"Converting {cached.name} to {self.cache}")
+                _write_cache([self._df], self.__cache_file, self.cache)
+                self._df = _read_cache(self.__cache_file)
         else:
             LOG.debug(f"Processing {self}")
-            self._df = _extract(self.file, password).assign(month=self.month)
-            self._df.to_parquet(self.__cache_file)
+            reader = READERS[self.file.suffix.lower()]
+            chunks = reader(self.file, password, extractor)
+            chunks = (chunk.assign(month=self.month) for chunk in chunks)
+            _write_cache(chunks, self.__cache_file, self.cache)
+            self._df = _read_cache(self.__cache_file)
             LOG.debug(f"Processed {self}")
+        self._df["card"] = self.card
+
+    def _cached(self) -> Optional[Path]:
+        # A cache in another format is converted instead of extracting again
+        paths = [self.__cache_file]
+        paths += [self.file.with_suffix(suffix) for suffix, _ in CACHES.values()]
+        return next((path for path in paths if path.is_file()), None)
+
+    def classify(
+        self, mapping: Optional[Mapping] = None, merchants: Optional[Merchants] = None
+    ) -> None:
+        # Names repeat a lot across rows, so each one is normalized and looked
+        # up once, then spread over the rows by its code
+        codes, names = pd.factorize(self._df["local"])
+        minimized = np.array([_minimize_name(name) for name in names], dtype=object)
+        if merchants is None:
+            self._df["local"] = minimized[codes]
+            self._classify(mapping or Mapping())
+            return
+
+        classes = merchants.lookup(pd.Series(minimized, dtype=object))
+        self._df["original"] = minimized[codes]
+        self._df["local"] = classes["local"].to_numpy()[codes]
+        self._df["type"] = classes["type"].to_numpy()[codes]
+        self._split(self._df)
+
+    def join(self) -> None:
+        """Takes the classified rows of every card's bill of this month."""
+        if self.bills != [self]:
+            self._df = pd.concat([f._df for f in self.bills], ignore_index=True)
+            self._removed = pd.concat(
+                [f._removed for f in self.bills], ignore_index=True
+            )
 
-        self._df["local"] = self._df["local"].apply(_minimize_name)
-        self._classify(mapping)
+    def split(self) -> dict[str, "File"]:
+        """One bill per card, sharing the rows of this one."""
+        cards = {}
+        for bill in self.bills:
+            f = File(bill.file, bill.month, bill.cache, bill.card)
+            f._df = self._df[self._df["card"].eq(bill.card).to_numpy()]
+            f._removed = self._removed[self._removed["card"].eq(bill.card).to_numpy()]
+            cards[bill.card] = f
+        return cards
+
+    def reclassify(
+        self, merchants: Merchants, affected: pd.Index
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Looks the rows of `affected` merchants up again.
+
+        Returns those rows as they were and as they are now, with their segment.
+        """
+        mask = self._df["original"].isin(affected).to_numpy()
+        before = self._df[mask].assign(segment=self.segment()[mask])
+
+        data = pd.concat([self._df, self._removed], ignore_index=True)
+        mask = data["original"].isin(affected).to_numpy()
+        classes = merchants.lookup(data.loc[mask, "original"])
+        data.loc[mask, "local"] = classes["local"].to_numpy()
+        data.loc[mask, "type"] = classes["type"].to_numpy()
+        self._split(data)
+
+        mask = self._df["original"].isin(affected).to_numpy()
+        after = self._df[mask].assign(segment=self.segment()[mask])
+        return before, after
 
     def __repr__(self) -> str:
         return f'File(file="{self.file}")'
@@ -76,13 +167,41 @@ class File:
 
         return Result(data)
 
-    def _classify(self, mapping: Mapping):
-        self._df = (
-            self._df.pipe(mapping.rename)
-            .pipe(mapping.classify)
-            .query('type != "remove"')
+    def top_by(
+        self, by: str, top: int = 10, keep_all: Sequence[str] = ()
+    ) -> dict[str, Result]:
+        data = self._df.reset_index(drop=True)
+        full = data[by].isin(keep_all)
+
+        largest = (
+            data[~full].groupby(by)["valor"].nlargest(top).index.get_level_values(-1)
+        )
+        rows = pd.concat([data.loc[largest], data[full]]).sort_values(
+            "valor", ascending=False, kind="stable"
+        )
+
+        return {key: Result(group) for key, group in rows.groupby(by, sort=False)}
+
+    def segment(self) -> np.ndarray:
+        return np.select(
+            [
+                self._df["type"].eq("recorrente"),
+                self._df["parcelas_faltantes"].gt(0),
+                self._df["parcela"].gt(0),
+            ],
+            ["recorrente", "parcelados", "finalizados"],
+            default="avista",
         )
 
+    def _classify(self, mapping: Mapping):
+        self._split(self._df.pipe(mapping.rename).pipe(mapping.classify))
+
+    def _split(self, data: pd.DataFrame):
+        # Removed rows are kept aside so a new mapping can bring them back
+        removed = data["type"].eq("remove").to_numpy()
+        self._df = _rows(data, ~removed)
+        self._removed = data[removed]
+
     def __gt__(self, other) -> bool:
         return self.month > other.month
 
@@ -96,65 +215,63 @@ class File:
         return self.month <= other.month
 
 
-def _extract(file: Path, password: Optional[str] = None) -> pd.DataFrame:
-    dfs = read_pdf(file, password=password, pages="all", silent=True)
-    dfs = [_process_fatura(df) for df in dfs[1:-1]]
-    df = pd.concat(dfs, axis=0).drop(columns=["delete"])
+def _rows(data: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
+    # Arrow columns are cut into the runs of kept rows, so they keep pointing at
+    # the memory-mapped cache instead of being filtered into new buffers
+    if mask.all():
+        return data
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.view(np.int8), [0]])))
+    runs = list(zip(edges[::2], edges[1::2] - edges[::2]))
+    if len(runs) > MAX_RUNS:  # too scattered to be worth a chunk per run
+        return data[mask].reset_index(drop=True)
 
-    df.valor = df.valor.str.replace(".", "", regex=False).str.replace(
-        ",", ".", regex=False
-    )
-    df = df.query('not valor.str.contains("Unnamed")')
-    df.valor = df.valor.astype(float)
+    def rows(column: pd.Series):
+        if not isinstance(column.dtype, pd.ArrowDtype):
+            return column.to_numpy()[mask]
+        array = pa.array(column.array)
+        chunks = pa.chunked_array([array.slice(*run) for run in runs], array.type)
+        return pd.array(chunks, dtype=column.dtype)
 
-    df.data = (
-        df.data.str.replace("jan", "01", regex=False)
-        .str.replace("fev", "02", regex=False)
-        .str.replace("mar", "03", regex=False)
-        .str.replace("abr", "04", regex=False)
-        .str.replace("mai", "05", regex=False)
-        .str.replace("jun", "06", regex=False)
-        .str.replace("jul", "07", regex=False)
-        .str.replace("ago", "08", regex=False)
-        .str.replace("set", "09", regex=False)
-        .str.replace("out", "10", regex=False)
-        .str.replace("nov", "11", regex=False)
-        .str.replace("dez", "12", regex=False)
-    )
+    columns = {name: rows(column) for name, column in data.items()}
+    return pd.DataFrame(columns, copy=False)
 
-    df.data = pd.to_datetime(
-        df.data + " " + date.today().strftime("%Y"), format="%d %m %Y"
-    )
 
-    mask_estorno = df.local.str.contains("Estorno")
-    df.loc[mask_estorno, "valor"] = -df.loc[mask_estorno, "valor"]
+def _read_cache(path: Path) -> pd.DataFrame:
+    if path.suffix == ".cache":
+        return pd.read_parquet(path)
 
-    parcelas = df.local.str.split(" - Parcela").str[1].str.split("/")
-    df["parcela"] = pd.to_numeric(parcelas.str[0], errors="coerce")
-    df["parcelas_totais"] = pd.to_numeric(parcelas.str[1], errors="coerce")
-    df["parcelas_faltantes"] = df["parcelas_totais"] - df["parcela"]
-    c = ["parcela", "parcelas_totais", "parcelas_faltantes"]
-    df[c] = df[c].fillna(0).astype(int)
+    # Arrow-backed columns keep pointing at the memory-mapped file
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
 
-    df["local"] = (
-        df["local"]
-        .str.replace(r"[^ A-Za-z0-9]", "", regex=True)
-        .str.replace(r"\s+", " ", regex=True)
-    )
 
-    return df
+def _write_cache(chunks: Iterable[pd.DataFrame], path: Path, cache="parquet") -> None:
+    # One row group (or record batch) per chunk, renamed into place once complete
+    partial = path.with_suffix(".partial")
+    writer, schema = None, None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = _cache_writer(partial, schema, cache)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
 
+    if writer is None:
+        raise Exception(f"No purchases found into {path.with_suffix('.pdf')}")
+    partial.replace(path)
 
-def _process_fatura(fatura: pd.DataFrame):
-    if fatura.shape[1] != 4:
-        return pd.DataFrame()
 
-    columns = ["data", "local", "delete", "valor"]
-    first_row = pd.DataFrame(fatura.columns).T
-    fatura.columns = columns
-    first_row.columns = columns
+def _cache_writer(path: Path, schema: pa.Schema, cache: str):
+    if cache == "parquet":
+        return pq.ParquetWriter(path, schema)
 
-    return pd.concat([first_row, fatura], axis=0)
+    _, compression = CACHES[cache]
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    return pa.ipc.new_file(str(path), schema, options=options)
 
 
 def _minimize_name(name: str) -> str:
@@ -166,5 +283,13 @@ def _minimize_name(name: str) -> str:
     return name
 
 
+# name: (suffix, compression)
+CACHES = {
+    "parquet": (".cache", None),
+    "feather": (".feather", None),
+    "feather-lz4": (".lz4.feather", "lz4"),
+}
+MAX_RUNS = 1_000
 STOPWORDS = ["DO", "DA", "DE", "COM", "PARCELA", "BR"]
+SEGMENTS = ["avista", "parcelados", "finalizados", "recorrente"]
 LOG = getLogger(__name__)
@@ -1,42 +1,235 @@
+from copy import copy
 from datetime import datetime as date
+from glob import glob
+from itertools import groupby
 from logging import getLogger
+from operator import attrgetter
 from pathlib import Path
+from queue import Queue
 from re import search
-from typing import Optional
+from threading import Thread
+from typing import Iterator, Optional
 
 import pandas as pd
+from rich.progress import Progress, ProgressColumn, Task
+from rich.text import Text
 
+from .cube import Cube
 from .file import File
-from .mapping import Mapping
+from .ledger import Ledger
+from .mapping import Mapping, layers
+from .merchants import Merchants
+from .readers import READERS
+from .result import Result
 
 
 class Files:
-    def __init__(self, folder: str) -> None:
+    def __init__(
+        self,
+        folder: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        cache: str = "parquet",
+        cards: Optional[dict[str, str]] = None,
+    ) -> None:
+        """Bills of `folder`, or of each labelled folder or glob in `cards`.
+
+        The cube, merchants and mapping of every card are kept in `folder`, and
+        the bills of one month are joined into a single `File` with a `card`
+        column once classified.
+        """
         self.folder = folder
-        self._filenames = [f for f in Path(folder).glob("*.pdf")]
-        if not self._filenames:
-            raise Exception(f'Not files found into "{self.folder}"')
+        cards = cards or {Path(folder).resolve().name: folder}
+        found = {card: sources(pattern) for card, pattern in cards.items()}
+        if not any(found.values()):
+            raise Exception(f'Not files found into "{", ".join(cards.values())}"')
 
-        months = [_get_date_from_filename(f.name) for f in self._filenames]
-        self._files = [File(f, m) for f, m in zip(self._filenames, months)]
-        self._files.sort()
-        self.last_file = len(self._filenames) - 1
+        # Bills outside the window are never extracted, loaded or classified
+        newest = max(max(months) for months in found.values() if months)
+        until = _first_day(until) if until else newest
+        since = _first_day(since) if since else _months_before(until, WINDOW - 1)
+        bills = [
+            File(f, m, cache, card)
+            for card, months in found.items()
+            for m, f in months.items()
+            if since <= m <= until
+        ]
+        if not bills:
+            raise Exception(
+                f'Not files between {since:%Y-%m} and {until:%Y-%m} into "{folder}"'
+            )
+
+        self.cards = list(cards)
+        self._bills = sorted(bills, key=attrgetter("month", "card"))
+        months = groupby(self._bills, attrgetter("month"))
+        self._files = [_joined(list(bills)) for _, bills in months]
+        self.last_file = len(self._files) - 1
+        self.ledger = Ledger()
+        self.cube = Cube(Path(folder) / "cube.cache")
+        self.merchants = Merchants(Path(folder))
 
     def process(
-        self, password: Optional[str] = None, mapping: Mapping = Mapping(), force=False
+        self,
+        password: Optional[str] = None,
+        mapping: Optional[Mapping] = None,
+        force=False,
+        workers: int = 2,
+        extractor: str = "tabula",
     ) -> None:
+        """Extracts, classifies and stores the bills as a pipeline.
+
+        Extraction workers feed the classification thread, which feeds the
+        ledger and cube writer here; queues are bounded so at most a few bills
+        are in flight, and the writer ingests them in month order, once every
+        card's bill of the month is ready.
+        """
+        mapping = mapping or Mapping(layers(self.folder))
         LOG.info(mapping)
-        [f.process(password, mapping, force) for f in self._files]
+        self.ledger = Ledger()
+        self.merchants.invalidate(mapping)
+        pending: Queue = Queue()
+        extracted: Queue = Queue(maxsize=workers)
+        classified: Queue = Queue(maxsize=workers)
+        for i in range(len(self._bills)):
+            pending.put(i)
+        for _ in range(workers):
+            pending.put(None)
+
+        def extract():
+            while (i := pending.get()) is not None:
+                try:
+                    self._bills[i].load(password, force, extractor)
+                    extracted.put((i, None))
+                except Exception as e:
+                    extracted.put((i, e))
+                progress.advance(stages["extract"])
+            extracted.put(None)
+
+        def classify():
+            running = workers
+            while running:
+                item = extracted.get()
+                if item is None:
+                    running -= 1
+                    continue
+                i, error = item
+                if error is None:
+                    try:
+                        self._bills[i].classify(mapping, self.merchants)
+                    except Exception as e:
+                        error = e
+                classified.put((i, error))
+                progress.advance(stages["classify"])
+            classified.put(None)
+
+        with Progress(*Progress.get_default_columns(), _RateColumn()) as progress:
+            stages = {
+                stage: progress.add_task(description, total=len(self._bills))
+                for stage, description in STAGES.items()
+            }
+            threads = [Thread(target=extract, daemon=True) for _ in range(workers)]
+            threads.append(Thread(target=classify, daemon=True))
+            for thread in threads:
+                thread.start()
+
+            ready, following, failure = set(), 0, None
+            while (item := classified.get()) is not None:
+                i, error = item
+                # Keep draining so no stage is left blocked on a full queue
+                failure = failure or error
+                if failure is not None:
+                    continue
+                ready.add(self._bills[i])
+                while following < len(self._files) and ready.issuperset(
+                    self._files[following].bills
+                ):
+                    f = self._files[following]
+                    f.join()
+                    self.ledger.ingest(f)
+                    self.cube.ingest(f)
+                    progress.advance(stages["store"], len(f.bills))
+                    following += 1
+
+            for thread in threads:
+                thread.join()
+            if failure is not None:
+                raise failure
+
+        self.cube.save()
+        self.merchants.save()
+        LOG.info(self.ledger)
+        LOG.info(self.cube)
+        LOG.info(self.merchants)
+
+    def remap(self, mapping: Optional[Mapping] = None) -> int:
+        """Applies an edited mapping, reclassifying only the merchants it affects.
+
+        Without a mapping, the current one is read again if its file changed.
+        Returns how many merchants were reclassified.
+        """
+        if mapping is None:
+            if not self.merchants.mapping.modified():
+                return 0
+            mapping = Mapping(self.merchants.mapping.files)
+
+        affected = self.merchants.invalidate(mapping)
+        if len(affected):
+            # Ledger keys use the display name, so it is linked again in memory
+            self.ledger = Ledger()
+            for f in self:
+                before, after = f.reclassify(self.merchants, affected)
+                self.cube.patch(f.month, before, after)
+                self.ledger.ingest(f)
+            self.cube.save()
+        self.merchants.save()
+        return len(affected)
 
     def summary_all(self, by: str = None) -> pd.DataFrame:
-        dfs = []
         by_ = ["month"]
         if by:
             by_.append(by)
 
-        for file in self:
-            dfs.append(file.summary(by_, add_total=False).data)
-        return pd.concat(dfs)
+        months = [file.month for file in self]
+        return self.cube.rollup(by_, months, self.cards)
+
+    def summary(self, by: str, add_total=True) -> Result:
+        """Totals of the latest bill by a cube dimension, like `File.summary`."""
+        months = [self[-1].month]
+        cells = self.cube.rollup(by, months, self.cards)
+        if add_total:
+            total = self.cube.rollup(None, months, self.cards).assign(**{by: "total"})
+            cells = pd.concat([cells, total[cells.columns]], ignore_index=True)
+        return Result(cells.astype({"qtd": int}))
+
+    def history(self) -> Iterator["Files"]:
+        """The bills up to each month, oldest first, as if they were the last.
+
+        Views share the rows and cube loaded here; the ledger is linked once,
+        month by month, keeping what it held after each bill.
+        """
+        ledger = Ledger()
+        for i, f in enumerate(self):
+            ledger.ingest(f)
+            view = copy(self)
+            view._files = self._files[: i + 1]
+            view.last_file = i
+            view.ledger = copy(ledger)
+            yield view
+
+    def by_card(self) -> dict[str, "Files"]:
+        """Each card's bills, sharing the rows, ledger and cube loaded here."""
+        if len(self.cards) == 1:
+            return {self.cards[0]: self}
+
+        views = {}
+        for card in self.cards:
+            view = copy(self)
+            view.cards = [card]
+            view._files = [bills[card] for f in self if card in (bills := f.split())]
+            view.last_file = len(view._files) - 1
+            view.ledger = self.ledger.for_card(card)
+            views[card] = view
+        return views
 
     def __getitem__(self, index=None) -> File:
         if index is None:
@@ -50,6 +243,53 @@ class Files:
         return f"Files(files={self._files})"
 
 
+class _RateColumn(ProgressColumn):
+    def render(self, task: Task) -> Text:
+        return Text(f"{task.speed or 0:.2f} faturas/s", style="progress.data.speed")
+
+
+def sources(pattern: str) -> dict[date, Path]:
+    """The fastest available bill of each month in the folders or files matching
+    `pattern`."""
+    # A folder is taken as it is, even with glob characters in its name
+    matches = [pattern] if Path(pattern).exists() else sorted(glob(pattern))
+    paths = []
+    for match in map(Path, matches):
+        paths += sorted(match.iterdir()) if match.is_dir() else [match]
+
+    found = {}
+    for suffix in READERS:
+        for path in (p for p in paths if p.suffix == suffix):
+            try:
+                month = _get_date_from_filename(path.name)
+            except Exception:
+                LOG.debug(f"Skipping {path.name}, no month in its name")
+                continue
+            if month in found:
+                LOG.debug(f"Skipping {path.name}, using {found[month].name}")
+                continue
+            found[month] = path
+    return found
+
+
+def _joined(bills: list[File]) -> File:
+    if len(bills) == 1:
+        return bills[0]
+    first = bills[0]
+    month = File(first.file, first.month, first.cache, ", ".join(f.card for f in bills))
+    month.bills = bills
+    return month
+
+
+def _first_day(month: date) -> date:
+    return date(month.year, month.month, 1)
+
+
+def _months_before(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
 def _get_date_from_filename(file: str) -> date:
     if s := search(r"(\d{2})(.)(\d{4})", file):
         month, _, year = s.groups()
@@ -61,4 +301,6 @@ def _get_date_from_filename(file: str) -> date:
     return date(int(year), int(month), 1)
 
 
+WINDOW = 12
+STAGES = {"extract": "Extraindo", "classify": "Classificando", "store": "Gravando"}
 LOG = getLogger(__name__)
@@ -0,0 +1,139 @@
+from datetime import datetime as date
+from logging import getLogger
+from typing import Optional
+
+import pandas as pd
+
+from .file import File
+from .result import Result
+
+
+class Ledger:
+    """Installment purchases linked across bills.
+
+    Each purchase is keyed by its card, normalized merchant, number of installments
+    and starting month, so the same purchase seen on later bills joins onto its
+    existing row instead of being scanned again. Installment values may differ
+    by a cent from bill to bill, so they are not part of the key. A purchase
+    missing from its card's latest bill was prepaid or cancelled, and ends at
+    the last bill it was seen on.
+    """
+
+    def __init__(self) -> None:
+        self._open = pd.DataFrame(columns=COLUMNS).astype(DTYPES)
+        self._closed = pd.DataFrame(columns=COLUMNS).astype(DTYPES)
+        self.month: Optional[int] = None
+
+    def ingest(self, file: File) -> None:
+        bill = _installments(file)
+        month = _month_index(file.month)
+        LOG.debug(f"Linking {len(bill)} installments from {file}")
+
+        merged = self._open.merge(
+            bill, on=KEY, how="outer", suffixes=("", "_new"), indicator=True
+        )
+        seen = merged["_merge"] != "left_only"
+        newer = seen & ~(merged["last_month"] > merged["last_month_new"])
+        for column in UPDATED:
+            merged[column] = merged[column].where(~newer, merged[f"{column}_new"])
+
+        merged["end"] = merged["start"] + merged["parcelas_totais"] - 1
+        if self.month is None or month >= self.month:
+            gone = (merged["_merge"] == "left_only") & merged["card"].isin(
+                _cards(file)
+            )
+            merged["end"] = merged["end"].where(~gone, merged["last_month"])
+        ledger = merged[COLUMNS].astype(DTYPES)
+        self.month = month if self.month is None else max(self.month, month)
+        closed = ledger["end"] <= self.month
+        self._open = ledger[~closed].reset_index(drop=True)
+        self._closed = pd.concat([self._closed, ledger[closed]], ignore_index=True)
+
+    def open(self, month: Optional[date] = None) -> pd.DataFrame:
+        """Installments still running after `month` (defaults to the latest bill)."""
+        month = self.month if month is None else _month_index(month)
+        if month is None:
+            return self._open.assign(remaining=pd.Series(dtype=int))
+
+        data = self._open
+        if month < self.month:
+            data = pd.concat([data, self._closed], ignore_index=True)
+        data = data[(data["start"] <= month) & (data["end"] > month)]
+        return data.assign(remaining=data["end"] - month)
+
+    def for_card(self, card: str) -> "Ledger":
+        """The installments of one card, as of the same latest bill."""
+        ledger = Ledger()
+        ledger._open = self._open[self._open["card"] == card].reset_index(drop=True)
+        ledger._closed = self._closed[self._closed["card"] == card].reset_index(
+            drop=True
+        )
+        ledger.month = self.month
+        return ledger
+
+    def remaining(self, by: Optional[str] = None) -> Result:
+        data = self.open()
+        data = data.assign(remaining_value=data["remaining"] * data["valor"])
+        if by:
+            data = (
+                data.groupby(by)
+                .agg(
+                    qtd=("valor", "count"),
+                    remaining=("remaining", "sum"),
+                    remaining_value=("remaining_value", "sum"),
+                )
+                .reset_index()
+            )
+        return Result(data.sort_values("remaining_value", ascending=False).round(2))
+
+    def __len__(self) -> int:
+        return len(self._open) + len(self._closed)
+
+    def __repr__(self) -> str:
+        return f"Ledger(open={len(self._open)}, closed={len(self._closed)})"
+
+
+def _installments(file: File) -> pd.DataFrame:
+    data = file._df.query("parcelas_totais > 0 and parcela > 0")
+    month = _month_index(file.month)
+    bill = pd.DataFrame(
+        {
+            "card": data["card"].to_numpy() if "card" in data else file.card,
+            "local": data["local"].to_numpy(),
+            "parcelas_totais": data["parcelas_totais"].to_numpy(),
+            "valor": data["valor"].round(2).to_numpy(),
+            "start": month - data["parcela"].to_numpy() + 1,
+            "type": data["type"].to_numpy(),
+            "last_parcela": data["parcela"].to_numpy(),
+            "last_month": month,
+        }
+    )
+    # Purchases alike but for their value are told apart by it, smallest first
+    bill["seq"] = bill.sort_values("valor", kind="stable").groupby(KEY[:-1]).cumcount()
+    return bill
+
+
+def _cards(file: File) -> list[str]:
+    return file._df["card"].unique().tolist() if "card" in file._df else [file.card]
+
+
+def _month_index(month: date) -> int:
+    return month.year * 12 + month.month - 1
+
+
+KEY = ["card", "local", "parcelas_totais", "start", "seq"]
+UPDATED = ["valor", "type", "last_parcela", "last_month"]
+COLUMNS = KEY + ["end"] + UPDATED
+DTYPES = {
+    "card": object,
+    "local": object,
+    "parcelas_totais": int,
+    "start": int,
+    "seq": int,
+    "valor": float,
+    "end": int,
+    "type": object,
+    "last_parcela": int,
+    "last_month": int,
+}
+LOG = getLogger(__name__)
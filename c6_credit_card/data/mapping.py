@@ -1,41 +1,157 @@
-from json import loads
+from json import dumps, loads
+from logging import getLogger
+from os import getenv
 from pathlib import Path
+from re import IGNORECASE, Pattern
+from re import compile as compile_regex
+from typing import Optional, Sequence, Union
 
 import pandas as pd
 
 FILE = Path(__file__).parents[0] / "mapping.json"
+USER_FILE = (
+    Path(getenv("XDG_CONFIG_HOME") or Path.home() / ".config")
+    / "c6_credit_card"
+    / "mapping.json"
+)
+ANY = ".*"
+COLUMNS = ["original", "local", "type"]
 
 
 class Mapping:
-    def __init__(self, file: Path = FILE) -> None:
-        with open(file) as f:
-            _mapping: dict[str, dict[str, list[str]]] = loads(f.read())
+    """Rename and classification rules read from layered mapping files.
 
-        self._mapping = {k: "|".join(v) for k, v in _mapping["mapping"].items()}
-        self._rename = {
-            k: r"\b({})\b".format("|".join(v)) for k, v in _mapping["rename"].items()
-        }
+    Later files take precedence: a keyword they list moves to their key. The
+    layers are merged into one set of patterns, so each extra layer costs
+    nothing per row. Nothing is read until the rules are first used, and the
+    merged patterns are compiled once per instance.
+    """
+
+    def __init__(self, files: Union[Path, Sequence[Path]] = FILE) -> None:
+        self.files = [Path(files)] if isinstance(files, (str, Path)) else list(files)
+        self.mtime: Optional[list[list[int]]] = None
+        self.__rules: Optional[dict] = None
+        self.__compiled: Optional[dict[str, dict[str, Pattern]]] = None
 
     def __repr__(self) -> str:
         return f"Mapping(mapping={self._mapping}, rename={self._rename})"
 
+    @property
+    def _rules(self) -> dict:
+        if self.__rules is None:
+            self.__rules = _load_rules(self.files)
+            self.mtime = self.__rules["mtime"]
+        return self.__rules
+
+    @property
+    def _rename(self) -> dict[str, str]:
+        return self._rules["rename"]
+
+    @property
+    def _mapping(self) -> dict[str, str]:
+        return self._rules["mapping"]
+
+    @property
+    def _compiled(self) -> dict[str, dict[str, Pattern]]:
+        if self.__compiled is None:
+            self.__compiled = {
+                section: {
+                    key: compile_regex(regex, IGNORECASE)
+                    for key, regex in self._rules[section].items()
+                }
+                for section in ("rename", "mapping")
+            }
+        return self.__compiled
+
+    def changed(self, other: "Mapping") -> list[str]:
+        """Patterns matching every merchant `other` may classify differently."""
+        patterns = []
+        rules = [(self._rename, other._rename), (self._mapping, other._mapping)]
+        for old, new in rules:
+            # Later rules win, so reordering them may change any merchant
+            if [k for k in old if k in new] != [k for k in new if k in old]:
+                return [ANY]
+            for key in old.keys() | new.keys():
+                if old.get(key) != new.get(key):
+                    patterns += [p for p in (old.get(key), new.get(key)) if p]
+        return patterns
+
+    def modified(self) -> bool:
+        if self.mtime is None:
+            return False
+        stats = [f.stat() for f in self.files]
+        return [[s.st_mtime_ns, s.st_size] for s in stats] != self.mtime
+
+    def save(self, file: Path) -> None:
+        text = dumps(self._rules["merged"], ensure_ascii=False, indent=4)
+        Path(file).write_text(text)
+
+    def match(self, names: Sequence[str]) -> pd.DataFrame:
+        """Display name and type of each merchant name, indexed by the name."""
+        data = pd.DataFrame({"local": list(names), "type": None})
+        return data.pipe(self.rename).pipe(self.classify)[COLUMNS].set_index("original")
+
     def rename(self, data: pd.DataFrame) -> pd.DataFrame:
-        data = data.copy()
+        """Renames merchants in place, keeping their name as "original"."""
         data["original"] = data.local.copy()
 
-        for key, regex in self._rename.items():
-            mask = data.local.str.contains(regex, case=False, regex=True)
+        for key, regex in self._compiled["rename"].items():
+            mask = data.local.str.contains(regex, regex=True)
             data.loc[mask, "local"] = key.upper()
 
         return data
 
     def classify(self, data: pd.DataFrame) -> pd.DataFrame:
-        data = data.copy()
-
-        for key, regex in self._mapping.items():
-            mask = data.local.str.contains(regex, case=False, regex=True)
+        """Sets the type of each merchant in place."""
+        for key, regex in self._compiled["mapping"].items():
+            mask = data.local.str.contains(regex, regex=True)
             data.loc[mask, "type"] = key
 
         data["type"] = data["type"].fillna("others")
 
         return data
+
+
+def layers(folder: Optional[str] = None) -> list[Path]:
+    """Existing mapping files, lowest precedence first: package, user, project."""
+    candidates = [FILE, USER_FILE]
+    if folder is not None:
+        candidates.append(Path(folder) / "mapping.json")
+    return [f for f in candidates if f.is_file()]
+
+
+def _load_rules(files: list[Path]) -> dict:
+    # Parsing the few small mapping files is cheaper than any cache of them
+    stats = [f.stat() for f in files]
+    LOG.debug(f"Parsing {', '.join(map(str, files))}")
+    mapping = _merge([loads(f.read_text()) for f in files])
+    return {
+        "mtime": [[s.st_mtime_ns, s.st_size] for s in stats],
+        "merged": mapping,
+        "mapping": {k: "|".join(v) for k, v in mapping["mapping"].items()},
+        "rename": {
+            k: r"\b({})\b".format("|".join(v)) for k, v in mapping["rename"].items()
+        },
+    }
+
+
+def _merge(layers: list[dict]) -> dict[str, dict[str, list[str]]]:
+    # Each keyword belongs to the key of the last layer listing it, so later
+    # layers win without adding patterns; keys keep their first position
+    merged = {}
+    for section in ("rename", "mapping"):
+        owners: dict[str, str] = {}
+        keys: dict[str, list[str]] = {}
+        for layer in layers:
+            for key, keywords in layer.get(section, {}).items():
+                keys.setdefault(key, [])
+                for keyword in keywords:
+                    owners.pop(keyword, None)
+                    owners[keyword] = key
+        for keyword, key in owners.items():
+            keys[key].append(keyword)
+        merged[section] = {k: v for k, v in keys.items() if v}
+    return merged
+
+
+LOG = getLogger(__name__)
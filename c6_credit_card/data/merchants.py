@@ -0,0 +1,72 @@
+from logging import getLogger
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from .mapping import Mapping
+
+
+class Merchants:
+    """Type and display name of every normalized merchant seen so far.
+
+    Rows are classified by looking their merchant up here, so the mapping
+    regexes only run on merchants never seen before. The lookup is persisted
+    with the rules that built it, and a changed mapping only drops the
+    merchants matched by the rules that changed.
+    """
+
+    def __init__(self, folder: Optional[Path] = None) -> None:
+        self.file = Path(folder) / "merchants.cache" if folder is not None else None
+        self.mapping: Optional[Mapping] = None
+        self._df = pd.DataFrame(columns=COLUMNS, dtype=object).set_index("original")
+        if self.file is not None and self.file.is_file() and self._rules.is_file():
+            LOG.debug(f"Reading merchants from {self.file}")
+            self._df = pd.read_parquet(self.file)
+            self.mapping = Mapping(self._rules)
+
+    def invalidate(self, mapping: Mapping) -> pd.Index:
+        """Switches to `mapping`, dropping the merchants it may classify differently."""
+        if self.mapping is None:
+            affected = self._df.index
+        else:
+            patterns = self.mapping.changed(mapping)
+            matches = pd.Series(False, index=self._df.index)
+            for pattern in patterns:
+                for column in (self._df.index.to_series(), self._df["local"]):
+                    matches |= column.str.contains(pattern, case=False).to_numpy()
+            affected = self._df.index[matches.to_numpy()]
+
+        if len(affected):
+            LOG.info(f"Reclassifying {len(affected)} merchants")
+        self._df = self._df.drop(affected)
+        self.mapping = mapping
+        return affected
+
+    def lookup(self, names: pd.Series) -> pd.DataFrame:
+        """Display name and type of each name, classifying the unknown ones."""
+        unknown = names[~names.isin(self._df.index)].unique()
+        if len(unknown):
+            self._df = pd.concat([self._df, self.mapping.match(unknown)])
+        return self._df.loc[names.to_numpy()]
+
+    def save(self) -> None:
+        if self.file is None or self.mapping is None:
+            return
+        LOG.debug(f"Saving merchants to {self.file}")
+        self._df.to_parquet(self.file)
+        self.mapping.save(self._rules)
+
+    @property
+    def _rules(self) -> Path:
+        return self.file.with_suffix(".json")
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    def __repr__(self) -> str:
+        return f"Merchants(merchants={len(self)})"
+
+
+COLUMNS = ["original", "local", "type"]
+LOG = getLogger(__name__)
@@ -0,0 +1,111 @@
+from datetime import datetime as date
+from functools import reduce
+from logging import getLogger
+from operator import and_, or_
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from .file import CACHES
+from .files import sources
+
+
+def query(
+    folder: str,
+    local: Sequence[str] = (),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    by: Sequence[str] = (),
+    top: Optional[int] = None,
+    cards: Optional[dict[str, str]] = None,
+) -> pa.Table:
+    """Runs an ad-hoc query straight against the cached bills of `folder`, or
+    of each labelled folder or glob in `cards`.
+
+    Filters are pushed down to the parquet scan, so row groups that cannot
+    match are skipped; merchants are matched as case-insensitive substrings
+    of the extracted (unclassified) name.
+    """
+    filters = []
+    if local:
+        filters.append(
+            reduce(
+                or_,
+                [
+                    pc.match_substring(ds.field("local"), name, ignore_case=True)
+                    for name in local
+                ],
+            )
+        )
+    if since is not None:
+        filters.append(ds.field("month") >= pa.scalar(since, pa.timestamp("ns")))
+    if until is not None:
+        filters.append(ds.field("month") <= pa.scalar(until, pa.timestamp("ns")))
+    if min_value is not None:
+        filters.append(ds.field("valor") >= min_value)
+    if max_value is not None:
+        filters.append(ds.field("valor") <= max_value)
+
+    cards = cards or {Path(folder).resolve().name: folder}
+    tables = []
+    for card, pattern in cards.items():
+        paths = _cached(pattern)
+        if not any(paths.values()):
+            continue
+        datasets = [ds.dataset(p, format=fmt) for fmt, p in paths.items() if p]
+        dataset = datasets[0] if len(datasets) == 1 else ds.dataset(datasets)
+        LOG.debug(f"querying {sum(map(len, paths.values()))} {card} files: {filters}")
+        table = dataset.to_table(
+            columns=COLUMNS, filter=reduce(and_, filters) if filters else None
+        )
+        if len(cards) > 1 or "card" in by:
+            column = pa.array([card] * table.num_rows, pa.string())
+            table = table.append_column("card", column)
+        tables.append(table)
+    if not tables:
+        raise Exception(f'Not cached files found into "{", ".join(cards.values())}"')
+    table = pa.concat_tables(tables)
+
+    # Installment suffixes would split one merchant into several groups
+    table = table.set_column(
+        table.column_names.index("local"),
+        "local",
+        pc.replace_substring_regex(table["local"], r"\s*Parcela\s*\d*$", ""),
+    )
+
+    sort_by = "valor"
+    if by:
+        table = (
+            table.group_by(list(by))
+            .aggregate([("valor", "count"), ("valor", "sum")])
+            .rename_columns([*by, "qtd", "tot_value"])
+        )
+        table = table.set_column(
+            table.num_columns - 1, "tot_value", pc.round(table["tot_value"], 2)
+        )
+        sort_by = "tot_value"
+
+    if top is not None:
+        return table.take(
+            pc.select_k_unstable(table, top, sort_keys=[(sort_by, "descending")])
+        )
+    return table.sort_by([(sort_by, "descending")])
+
+
+def _cached(pattern: str) -> dict[str, list[str]]:
+    paths = {"parquet": [], "ipc": []}
+    for _, f in sorted(sources(pattern).items()):
+        cached = (f.with_suffix(suffix) for suffix, _ in reversed(CACHES.values()))
+        if path := next((path for path in cached if path.is_file()), None):
+            kind = "parquet" if path.suffix == ".cache" else "ipc"
+            paths[kind].append(str(path))
+    return paths
+
+
+COLUMNS = ["month", "data", "local", "valor", "parcela", "parcelas_totais"]
+LOG = getLogger(__name__)
@@ -0,0 +1,243 @@
+from datetime import datetime as date
+from itertools import chain
+from json import dumps, loads
+from pathlib import Path
+from re import DOTALL, findall, match
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+from tabula.io import read_pdf
+
+Reader = Callable[[Path, Optional[str], str], Iterator[pd.DataFrame]]
+
+
+def read_csv_bill(
+    file: Path, password: Optional[str] = None, extractor: str = "tabula"
+) -> Iterator[pd.DataFrame]:
+    chunks = pd.read_csv(
+        file,
+        sep=";",
+        encoding="utf-8-sig",
+        usecols=list(CSV_COLUMNS),
+        dtype=str,
+        chunksize=CHUNK_SIZE,
+    )
+    for chunk in chunks:
+        chunk = chunk.rename(columns=CSV_COLUMNS).dropna(subset=["valor"])
+        # Installments go back into the name, as the PDF prints them
+        parcela = chunk["parcela"].fillna("")
+        installment = parcela.str.contains("/", regex=False)
+        chunk["local"] = chunk["local"].where(
+            ~installment, chunk["local"] + " - Parcela " + parcela
+        )
+        df = pd.DataFrame(
+            {
+                "data": pd.to_datetime(chunk["data"], format="%d/%m/%Y"),
+                "local": chunk["local"],
+                "valor": chunk["valor"].str.replace(",", ".").astype(float),
+            }
+        )
+        yield _standardize(df)
+
+
+def read_ofx_bill(
+    file: Path, password: Optional[str] = None, extractor: str = "tabula"
+) -> Iterator[pd.DataFrame]:
+    text = file.read_text(encoding="latin-1")
+    rows = []
+    for transaction in findall(r"<STMTTRN>(.*?)</STMTTRN>", text, DOTALL):
+        fields = dict(findall(r"<(\w+)>([^<\r\n]*)", transaction))
+        rows.append(
+            {
+                "data": fields["DTPOSTED"][:8],
+                "local": (fields.get("MEMO") or fields.get("NAME", "")).strip(),
+                # Charges are debits on the card account
+                "valor": -float(fields["TRNAMT"].replace(",", ".")),
+            }
+        )
+    if not rows:
+        return
+
+    df = pd.DataFrame(rows)
+    df["data"] = pd.to_datetime(df["data"], format="%Y%m%d")
+    yield _standardize(df)
+
+
+def read_pdf_bill(
+    file: Path, password: Optional[str] = None, extractor: str = "tabula"
+) -> Iterator[pd.DataFrame]:
+    if extractor not in EXTRACTORS:
+        raise Exception(f'Unknown extractor "{extractor}", use {list(EXTRACTORS)}')
+
+    for table in EXTRACTORS[extractor](file, password):
+        chunk = _normalize(_process_fatura(table))
+        if not chunk.empty:
+            yield chunk
+
+
+def record_tables(
+    file: Path, password: Optional[str] = None, extractor: str = "tabula"
+) -> Path:
+    """Saves the raw tables of `file` to be replayed by the recorded extractor."""
+    tables = EXTRACTORS[extractor](file, password, purchases_only=False)
+    pages = [
+        [[str(c) for c in t.columns]]
+        + t.astype(object).where(t.notna(), None).values.tolist()
+        for t in tables
+    ]
+    recorded = file.with_suffix(".pages.json")
+    recorded.write_text(dumps(pages, ensure_ascii=False))
+    return recorded
+
+
+def _tabula_tables(
+    file: Path, password: Optional[str] = None, purchases_only=True
+) -> Iterator[pd.DataFrame]:
+    # A single tabula run reads every page; tables are handed over and
+    # dropped one at a time so only the current one is normalized
+    dfs = read_pdf(file, password=password, pages="all", silent=True)
+    dfs.reverse()
+    tables = (dfs.pop() for _ in range(len(dfs)))
+    return _purchase_tables(tables) if purchases_only else tables
+
+
+def _recorded_tables(
+    file: Path, password: Optional[str] = None, purchases_only=True
+) -> Iterator[pd.DataFrame]:
+    recorded = file.with_suffix(".pages.json")
+    if not recorded.is_file():
+        raise Exception(f"No recorded tables for {file}, expected {recorded}")
+
+    # Recorded tables are tabula's, summary and footer included
+    tables = (
+        pd.DataFrame(rows[1:], columns=rows[0])
+        for rows in loads(recorded.read_text())
+    )
+    return _purchase_tables(tables) if purchases_only else tables
+
+
+def _text_tables(
+    file: Path, password: Optional[str] = None, purchases_only=True
+) -> Iterator[pd.DataFrame]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise Exception("The text extractor needs pypdf: pip install pypdf")
+
+    texts = [page.extract_text() for page in PdfReader(file, password=password).pages]
+    # Shaped like tabula's tables, which take the first row as header
+    tables = (
+        pd.DataFrame(rows[1:], columns=rows[0])
+        for rows in map(_text_rows, texts)
+        if rows
+    )
+    if purchases_only:
+        return tables
+    # Wrapped in the bill summary and footer, as tabula reads them
+    summary = (pd.DataFrame({"resumo": text.splitlines()}) for text in texts[:1])
+    footer = (pd.DataFrame({"rodape": text.splitlines()}) for text in texts[-1:])
+    return chain(summary, tables, footer)
+
+
+def _text_rows(text: str) -> list[list[str]]:
+    rows = []
+    for line in text.splitlines():
+        if found := match(TEXT_LINE, line.strip()):
+            data, local, valor = found.groups()
+            rows.append([data, local, "", valor])
+    return rows
+
+
+def _purchase_tables(tables: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    # The first table is the bill summary and the last one its footer
+    next(tables, None)
+    previous = next(tables, None)
+    for table in tables:
+        yield previous
+        previous = table
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return df
+    df = df.drop(columns=["delete"])
+    df.valor = df.valor.str.replace(".", "", regex=False).str.replace(
+        ",", ".", regex=False
+    )
+    df = df.query('not valor.str.contains("Unnamed")')
+    df.valor = df.valor.astype(float)
+
+    df.data = (
+        df.data.str.replace("jan", "01", regex=False)
+        .str.replace("fev", "02", regex=False)
+        .str.replace("mar", "03", regex=False)
+        .str.replace("abr", "04", regex=False)
+        .str.replace("mai", "05", regex=False)
+        .str.replace("jun", "06", regex=False)
+        .str.replace("jul", "07", regex=False)
+        .str.replace("ago", "08", regex=False)
+        .str.replace("set", "09", regex=False)
+        .str.replace("out", "10", regex=False)
+        .str.replace("nov", "11", regex=False)
+        .str.replace("dez", "12", regex=False)
+    )
+
+    df.data = pd.to_datetime(
+        df.data + " " + date.today().strftime("%Y"), format="%d %m %Y"
+    )
+
+    return _standardize(df)
+
+
+def _standardize(df: pd.DataFrame) -> pd.DataFrame:
+    # Refunds are credits whatever sign the source gives them
+    mask_estorno = df.local.str.contains("Estorno")
+    df.loc[mask_estorno, "valor"] = -df.loc[mask_estorno, "valor"].abs()
+
+    parcelas = df.local.str.extract(r" - Parcela\s*(\d+)\s*/\s*(\d+)")
+    df["parcela"] = pd.to_numeric(parcelas[0], errors="coerce")
+    df["parcelas_totais"] = pd.to_numeric(parcelas[1], errors="coerce")
+    df["parcelas_faltantes"] = df["parcelas_totais"] - df["parcela"]
+    c = ["parcela", "parcelas_totais", "parcelas_faltantes"]
+    df[c] = df[c].fillna(0).astype(int)
+
+    df["local"] = (
+        df["local"]
+        .str.replace(r"[^ A-Za-z0-9]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+    )
+
+    return df
+
+
+def _process_fatura(fatura: pd.DataFrame):
+    if fatura.shape[1] != 4:
+        return pd.DataFrame()
+
+    columns = ["data", "local", "delete", "valor"]
+    first_row = pd.DataFrame(fatura.columns).T
+    fatura.columns = columns
+    first_row.columns = columns
+
+    return pd.concat([first_row, fatura], axis=0)
+
+
+# Fastest first: a month with several exports is read from the first one found
+READERS: dict[str, Reader] = {
+    ".csv": read_csv_bill,
+    ".ofx": read_ofx_bill,
+    ".pdf": read_pdf_bill,
+}
+EXTRACTORS = {
+    "tabula": _tabula_tables,
+    "text": _text_tables,
+    "recorded": _recorded_tables,
+}
+TEXT_LINE = r"^(\d{2} [a-z]{3})\s+(.+?)\s+(-?[\d.]+,\d{2})$"
+CSV_COLUMNS = {
+    "Data de Compra": "data",
+    "Descrição": "local",
+    "Parcela": "parcela",
+    "Valor (em R$)": "valor",
+}
+CHUNK_SIZE = 10_000
@@ -11,12 +11,16 @@ class Result:
     data: DataFrame
 
     def top(self, top: int):
-        return Result(self.data.head(top).copy())
+        return Result(self.data.head(top))
 
     def sort(self, **kwargs):
         return Result(self.data.sort_values(**kwargs))
 
     def print(
-        self, title=None, show_index: bool = False, index_name: Optional[str] = None
+        self,
+        title=None,
+        show_index: bool = False,
+        index_name: Optional[str] = None,
+        max_rows: Optional[int] = None,
     ):
-        return df_to_table(self.data, title, show_index, index_name)
+        return df_to_table(self.data, title, show_index, index_name, max_rows)
@@ -1,42 +1,112 @@
 from typing import Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from rich.table import Table
 
 
 def df_to_table(
         df: pd.DataFrame, title=None,
-        show_index: bool = False, index_name: Optional[str] = None) -> Table:
-    """Convert a pandas.DataFrame obj into a rich.Table obj.
+        show_index: bool = False, index_name: Optional[str] = None,
+        max_rows: Optional[int] = None) -> Table:
+    """Convert a pandas.DataFrame obj into a rich.Table obj, formatting whole columns at once.
     Args:
-        df (DataFrame): A Pandas DataFrame to be converted to a rich Table.
+        df (DataFrame): A Pandas DataFrame to be converted to a rich Table. It is not modified.
         show_index (bool): Add a column with a row count to the table. Defaults to True.
         index_name (str, optional): The column name to give to the index column. Defaults to None, showing no value.
+        max_rows (int, optional): Only the first rows are formatted and shown. Defaults to all of them.
     Returns:
         Table: The rich Table instance passed, populated with the DataFrame values."""
     rich_table = Table(title=title)
 
-    dt_cols = []
-    if 'data' in df.columns:
-        df.data = df.data.dt.strftime('%d/%m')
-        dt_cols.append('data')
-    if 'month' in df.columns:
-        df.month = df.month.dt.strftime('%m/%Y')
-        dt_cols.append('month')
+    if max_rows is not None:
+        df = df.iloc[:max_rows]
 
-    df = df.drop(columns=['parcelas_totais'], errors='ignore')
-    df = df[dt_cols + [c for c in df.columns if c not in dt_cols]]
+    dt_cols = [c for c in ('data', 'month') if c in df.columns]
+    names = dt_cols + [c for c in df.columns if c not in dt_cols and c != 'parcelas_totais']
+    columns = [_format(name, df[name]) for name in names]
 
     if show_index:
         index_name = str(index_name) if index_name else ""
         rich_table.add_column(index_name)
+        columns.insert(0, [str(index) for index in range(len(df))])
 
-    for column in df.columns:
+    for column in names:
         rich_table.add_column(str(column))
 
-    for index, value_list in enumerate(df.values.tolist()):
-        row = [str(index)] if show_index else []
-        row += [str(x) for x in value_list]
+    for row in zip(*columns):
         rich_table.add_row(*row)
 
     return rich_table
+
+
+def _format(name, column: pd.Series) -> list:
+    if column.dtype.kind == 'M':
+        return column.dt.strftime('%m/%Y' if name == 'month' else '%d/%m').tolist()
+    if column.dtype.kind == 'f':
+        # Same as the HTML report: en-US separators, R$ only on money columns
+        prefix = 'R$ ' if name in MONEY_COLUMNS else ''
+        return _numbers(column.to_numpy(dtype=float, na_value=np.nan), prefix)
+    return column.astype(str).tolist()
+
+
+def _numbers(values: np.ndarray, prefix: str) -> list:
+    # '{:,.2f}' over a whole column: cents are rounded by numpy and written out,
+    # three digits at a time, by pyarrow string kernels
+    missing = np.isnan(values)
+    absolute = np.abs(np.where(missing, 0.0, values))
+    scaled = absolute * 100
+    cents = np.rint(scaled)
+    # Scaling may move a value across a half cent, so those few are rounded
+    # by str.format, as their digits are
+    halves = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    cents[halves] = [int(f'{v:.2f}'.replace('.', '')) for v in absolute[halves]]
+    units, cents = np.divmod(cents.astype(np.int64), 100)
+
+    rest, group = np.divmod(units, 1000)
+    text = _digits(group, rest > 0)
+    while rest.any():
+        higher = rest > 0
+        rest, group = np.divmod(rest, 1000)
+        grouped = pc.binary_join_element_wise(_digits(group, rest > 0), text, ',')
+        text = pc.if_else(higher, grouped, text)
+
+    sign = pc.if_else(pa.array(np.signbit(values)), prefix + '-', prefix)
+    fraction = pc.utf8_lpad(pc.cast(pa.array(cents), pa.string()), width=2, padding='0')
+    text = pc.binary_join_element_wise(sign, text, '')
+    text = pc.binary_join_element_wise(text, fraction, '.')
+    text = pc.if_else(pa.array(missing), '', text)
+    return text.to_numpy(zero_copy_only=False).tolist()
+
+
+def _digits(values: np.ndarray, padded: np.ndarray) -> pa.Array:
+    text = pc.cast(pa.array(values), pa.string())
+    return pc.if_else(padded, pc.utf8_lpad(text, width=3, padding='0'), text)
+
+
+def arrow_to_table(table: pa.Table, title=None) -> Table:
+    """Convert a pyarrow.Table obj into a rich.Table obj, formatting each column with pyarrow compute.
+    Args:
+        table (pa.Table): An Arrow table to be converted to a rich Table.
+    Returns:
+        Table: The rich Table instance populated with the Arrow table values."""
+    rich_table = Table(title=title)
+
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_timestamp(column.type):
+            column = pc.strftime(column, format='%m/%Y' if name == 'month' else '%d/%m')
+        elif pa.types.is_floating(column.type):
+            column = pc.round(column, 2)
+        rich_table.add_column(name)
+        columns.append(column.cast(pa.string()).to_pylist())
+
+    for row in zip(*columns):
+        rich_table.add_row(*row)
+
+    return rich_table
+
+
+MONEY_COLUMNS = ('valor', 'tot_value')
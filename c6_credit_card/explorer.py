@@ -0,0 +1,181 @@
+from cmd import Cmd
+from datetime import datetime as date
+from logging import getLogger
+from shlex import split
+from time import perf_counter
+from typing import Callable, Optional
+
+import pandas as pd
+from rich.console import Console
+from rich.text import Text
+from uniplot.uniplot import plot_to_string
+
+from c6_credit_card.daemon import Client
+from c6_credit_card.data.file import File
+from c6_credit_card.data.files import Files
+from c6_credit_card.data.result import Result
+from c6_credit_card.services import (
+    hide_card,
+    plot_data_total,
+    plot_data_type,
+    plot_next_months,
+    top_expenses_by_type,
+)
+
+
+class Explorer(Cmd):
+    """Interactive session over bills that were loaded once.
+
+    Every command reads the in-memory frames, the ledger and the cube, so
+    nothing is extracted, read from disk or reclassified between commands.
+    """
+
+    intro = Client.intro
+    prompt = Client.prompt
+
+    def __init__(
+        self,
+        files: Files,
+        console: Console = None,
+        load: Optional[Callable[[], Files]] = None,
+    ) -> None:
+        super().__init__()
+        self.files = files
+        self.console = console or Console()
+        self.file: File = files[-1]
+        self._load = load
+
+    def do_month(self, arg: str):
+        """month [YYYY-MM]: show or change the bill being explored."""
+        if arg:
+            month = date.strptime(arg.strip(), "%Y-%m")
+            matches = [f for f in self.files if f.month == month]
+            if not matches:
+                self.console.print(f"[red]No bill for {arg}[/red]")
+                return
+            self.file = matches[-1]
+        self.console.print(f"Using {self.file}")
+
+    def do_months(self, arg: str):
+        """months: list the loaded bills."""
+        for f in self.files:
+            self.console.print(f"{f.month:%Y-%m} {f.file.name}")
+
+    def do_summary(self, arg: str):
+        """summary [by]: totals of the current bill by a column (default type)."""
+        by = arg.strip() or "type"
+        self.console.print(self.file.summary(by).print(f"Total por {by}"))
+
+    def do_select(self, arg: str):
+        """select field=value ... [top=N]: purchases of the current bill.
+
+        e.g. select type=comida valor=>100 top=5
+        """
+        kwargs = dict(_parse_value(token) for token in split(arg))
+        top = kwargs.pop("top", 20)
+        if not kwargs:
+            self.console.print("[red]select needs at least one field=value[/red]")
+            return
+        result = hide_card(self.files, self.file.select(**kwargs))
+        title = f"{len(result.data)} compras R${result.data.valor.sum():,.2f}"
+        self.console.print(result.top(top).print(title))
+
+    def do_top(self, arg: str):
+        """top [N] [type]: largest purchases of the current bill, overall or of a category."""
+        args = arg.split()
+        top = int(args.pop(0)) if args and args[0].isdigit() else 10
+        if args:
+            result = top_expenses_by_type(self.file, top).get(" ".join(args))
+            if result is None:
+                self.console.print(f"[red]No purchases of type {' '.join(args)}[/red]")
+                return
+        else:
+            result = Result(self.file._df.nlargest(top, "valor"))
+        result = hide_card(self.files, result)
+        self.console.print(result.top(top).print(f"Top {top} gastos"))
+
+    def do_compare(self, arg: str):
+        """compare YYYY-MM YYYY-MM [by]: compare two months by a column (default type)."""
+        args = arg.split()
+        if len(args) < 2:
+            self.console.print("[red]compare needs two months[/red]")
+            return
+        months = [pd.Timestamp(date.strptime(m, "%Y-%m")) for m in args[:2]]
+        by = args[2] if len(args) > 2 else "type"
+
+        cells = self.files.cube.rollup(["month", by], months, self.files.cards)
+        table = cells.pivot_table(
+            index=by, columns="month", values="tot_value", aggfunc="sum", fill_value=0
+        ).reindex(columns=months, fill_value=0)
+        table.columns = [f"{m:%m/%Y}" for m in months]
+        table["diff"] = table.iloc[:, 1] - table.iloc[:, 0]
+        table = table.sort_values("diff", ascending=False).round(2).reset_index()
+        self.console.print(Result(table).print(f"{args[0]} x {args[1]}"))
+
+    def do_remaining(self, arg: str):
+        """remaining [by]: open installments left to pay, per purchase or grouped by a column."""
+        by = arg.strip() or None
+        result = hide_card(self.files, self.files.ledger.remaining(by))
+        total = result.data.remaining_value.sum()
+        self.console.print(result.top(20).print(f"Parcelas a pagar: R${total:,.2f}"))
+
+    def do_replot(self, arg: str):
+        """replot: redraw the monthly, category and next months charts."""
+        ys, xs = plot_next_months(self.files)
+        self._plot(ys=ys, xs=xs, lines=True, title="Gastos próximos meses")
+        ys, xs = plot_data_total(self.files)
+        self._plot(ys=ys, xs=xs, lines=True, title="Gastos por mês")
+        ys, xs, tps = plot_data_type(self.files)
+        self._plot(
+            ys=ys,
+            xs=xs,
+            legend_labels=tps,
+            lines=True,
+            title="Gastos das categorias por mês",
+        )
+
+    def do_reload(self, arg: str):
+        """reload: pick up new bills from the folder, extracting only the new ones."""
+        if self._load is None:
+            self.console.print("[red]reload is not available in this session[/red]")
+            return
+        self.files = self._load()
+        self.file = self.files[-1]
+        self.console.print(f"{len(self.files)} bills loaded, using {self.file}")
+
+    def do_quit(self, arg: str):
+        """quit: leave the explorer."""
+        return True
+
+    do_EOF = do_quit
+
+    def emptyline(self):
+        pass
+
+    def onecmd(self, line: str):
+        start = perf_counter()
+        try:
+            if changed := self.files.remap():
+                self.console.print(f"Mapping changed, {changed} merchants reclassified")
+            return super().onecmd(line)
+        except Exception as e:
+            self.console.print(f"[red]{e}[/red]")
+        finally:
+            LOG.debug(f"{line!r} answered in {(perf_counter() - start) * 1000:.1f}ms")
+
+    def _plot(self, **kwargs):
+        if kwargs["ys"] is not None and len(kwargs["ys"]):
+            self.console.print(Text.from_ansi(plot_to_string(**kwargs)))
+
+
+def _parse_value(token: str):
+    field, _, value = token.partition("=")
+    for cast in (int, float):
+        try:
+            return field, cast(value)
+        except ValueError:
+            pass
+    return field, value
+
+
+LOG = getLogger(__name__)
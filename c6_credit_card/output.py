@@ -1,10 +1,17 @@
+from json import dumps
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
 import pandas as pd
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
 from rich.console import Group
 from rich.layout import Layout
 from rich.panel import Panel
 from uniplot.uniplot import plot
 
 from c6_credit_card.data.file import File
+from c6_credit_card.data.result import Result
 
 
 def display_terminal_output(
@@ -17,6 +24,9 @@ def display_terminal_output(
     ys_data_type,
     xs_data_type,
     tps_data_type,
+    top_by_type,
+    segments,
+    summaries,
 ):
     """Displays the C6 credit card analysis output in the terminal."""
 
@@ -34,66 +44,70 @@ def display_terminal_output(
         title="Gastos das categorias por mês",
     )
 
-    # ys, xs = plot_gastos_por_dia(file) # This was originally in __main__ but plot_gastos_por_dia is in services
-    # plot(ys=ys, xs=xs, lines=False, title="Gastos por dia")
-
     top_panel_layout = (
         Layout()
     )  # Renamed from top_panel to avoid conflict with rich.panel.Panel
-    summary = file.summary("type")
+    summary = summaries["type"]
+    by_local = summaries["local"]
     top_panel_layout.split_row(
         summary.print("Total por tipo :warning:"),
-        file.summary("local").top(8).print("Top locais"),
-        file.summary("local", add_total=False)
+        by_local.print("Top locais", max_rows=8),
+        Result(by_local.data.iloc[:-1])  # without the total row
         .sort(by=["qtd", "tot_value"], ascending=False)
-        .top(8)
-        .print("Top # locais"),
-        file.summary("parcelas_faltantes").print("Total por parcelas"),
+        .print("Top # locais", max_rows=8),
+        summaries["parcelas_faltantes"].print("Total por parcelas"),
     )
     CONSOLE.print(Panel(Group(top_panel_layout), title="Summary"), height=20)
 
-    tot_avista = file.select(parcelas_faltantes=0, parcela=0, type=" != 'recorrente'")
+    tot_avista = segments["avista"]
     tot_avista_val = tot_avista.data.valor.sum()
 
-    tot_parcelados = file.select(parcelas_faltantes=" > 0", type=" != 'recorrente'")
+    tot_parcelados = segments["parcelados"]
     tot_parcelados_val = tot_parcelados.data.valor.sum()
 
-    tot_fin = file.select(parcela=" > 0", parcelas_faltantes=0, type=" != 'recorrente'")
+    tot_fin = segments["finalizados"]
     tot_fin_val = tot_fin.data.valor.sum()
 
     summaries_prints = []
-    # Ensure file.summary("type").data exists and is a DataFrame
-    if hasattr(file.summary("type"), "data") and isinstance(
-        file.summary("type").data, pd.DataFrame
-    ):
-        for tp in file.summary("type").data.query('type != "total"').type:
-            tp_data = file.select(type=tp)
-            qtd_compras = tp_data.data.shape[0]
-            tp_value = tp_data.data.valor.sum()
-            if tp != "others":
-                tp_data = tp_data.top(10)
+    # Ensure summary.data exists and is a DataFrame
+    if hasattr(summary, "data") and isinstance(summary.data, pd.DataFrame):
+        for row in summary.data.query('type != "total"').itertuples():
+            if row.type not in top_by_type:
+                continue
             summaries_prints.append(
-                tp_data.print(
-                    f"Top gastos {tp}: {qtd_compras} compras R${tp_value:,.2f}"
+                top_by_type[row.type].print(
+                    f"Top gastos {row.type}: {row.qtd} compras R${row.tot_value:,.2f}"
                 )
             )
     else:
         CONSOLE.print(
-            "[bold red]Warning: Could not generate type summaries because file.summary('type').data is not as expected.[/bold red]"
+            "[bold red]Warning: Could not generate type summaries because the summary by type is not as expected.[/bold red]"
         )
 
     bottom_panel_group = [
-        tot_parcelados.top(10).print(
-            f"Compras parceladas: R${tot_parcelados_val:,.2f}"
+        tot_parcelados.print(
+            f"Compras parceladas: R${tot_parcelados_val:,.2f}", max_rows=10
         ),
-        tot_avista.top(10).print(f"Compras à vista: R${tot_avista_val:,.2f}"),
-        tot_fin.top(10).print(f"Compras finalizadas: R${tot_fin_val:,.2f}"),
+        tot_avista.print(f"Compras à vista: R${tot_avista_val:,.2f}", max_rows=10),
+        tot_fin.print(f"Compras finalizadas: R${tot_fin_val:,.2f}", max_rows=10),
         *summaries_prints,
     ]
     CONSOLE.print(Panel(Group(*bottom_panel_group), title="Top gastos"))
 
 
-def generate_html_output(
+def generate_html_output(assets: str = "cdn", **data) -> str:
+    """Generates a beautiful HTML representation of the C6 credit card analysis with Plotly charts.
+
+    `data` is the report data passed on to `html_payload`.
+    `assets` picks where plotly.js and the CSS come from: the plotly CDN,
+    the files written by `write_assets` next to the report ("shared"), or
+    the report itself ("inline") so it renders offline as a single file.
+    `transactions`, when given, are listed in a table laid out by the browser.
+    """
+    return render_html(**html_payload(**data), assets=assets)
+
+
+def html_payload(
     file: File,
     ys_next_months,
     xs_next_months,
@@ -102,8 +116,15 @@ def generate_html_output(
     ys_data_type,
     xs_data_type,
     tps_data_type,
-):
-    """Generates a beautiful HTML representation of the C6 credit card analysis with Plotly charts."""
+    top_by_type,
+    segments,
+    summaries,
+    ys_daily=(),
+    xs_daily=(),
+    transactions: Optional[pd.DataFrame] = None,
+) -> dict:
+    """What `render_html` shows of the report data: numbers, chart series and
+    table fragments."""
 
     # Calculate summary statistics
     total_spending = sum(ys_data_total) if ys_data_total else 0
@@ -122,18 +143,18 @@ def generate_html_output(
     )
 
     # Get spending breakdown
-    tot_parcelados = file.select(parcelas_faltantes=" > 0", type=" != 'recorrente'")
+    tot_parcelados = segments["parcelados"]
     tot_parcelados_val = (
         tot_parcelados.data.valor.sum() if not tot_parcelados.data.empty else 0
     )
 
-    tot_avista = file.select(parcelas_faltantes=0, parcela=0, type=" != 'recorrente'")
+    tot_avista = segments["avista"]
     tot_avista_val = tot_avista.data.valor.sum() if not tot_avista.data.empty else 0
 
-    tot_fin = file.select(parcela=" > 0", parcelas_faltantes=0, type=" != 'recorrente'")
+    tot_fin = segments["finalizados"]
     tot_fin_val = tot_fin.data.valor.sum() if not tot_fin.data.empty else 0
 
-    tot_recorrente = file.select(type="recorrente")
+    tot_recorrente = segments["recorrente"]
     tot_recorrente_val = (
         tot_recorrente.data.valor.sum() if not tot_recorrente.data.empty else 0
     )
@@ -144,18 +165,9 @@ def generate_html_output(
     total_transactions = len(file._df)
 
     # Prepare chart data
-    next_months_data = {
-        "x": xs_next_months if xs_next_months else [],
-        "y": ys_next_months if ys_next_months else [],
-    }
-
-    monthly_data = {
-        "x": [x.strftime("%Y-%m-%d") for x in xs_data_total] if xs_data_total else [],
-        "y": ys_data_total if ys_data_total else [],
-    }
-    if len(xs_data_total) >= 12:
-        monthly_data["x"] = monthly_data["x"][-12:]
-        monthly_data["y"] = monthly_data["y"][-12:]
+    next_months_data = _series(xs_next_months or [], ys_next_months or [])
+    monthly_data = _series(xs_data_total[-12:], ys_data_total[-12:], "%Y-%m")
+    daily_data = _series(xs_daily, ys_daily, "%Y-%m-%d")
 
     # Prepare categories data
     categories_data = []
@@ -167,30 +179,14 @@ def generate_html_output(
         for i, category_name in enumerate(tps_data_type):
             cat_data = {
                 "name": category_name,
-                "x": xs_data_type[i].astype(str).tolist(),
-                "y": ys_data_type[i],
+                **_series(xs_data_type[i][-12:], ys_data_type[i][-12:], "%Y-%m"),
             }
-            if len(xs_data_type[i]) >= 12:
-                cat_data["x"] = cat_data["x"][-12:]
-                cat_data["y"] = cat_data["y"][-12:]
             categories_data.append(cat_data)
 
     # Get summary data
-    summary_type_df = (
-        file.summary("type").data
-        if hasattr(file.summary("type"), "data")
-        else pd.DataFrame()
-    )
-    summary_local_df = (
-        file.summary("local").top(8).data
-        if hasattr(file.summary("local"), "data")
-        else pd.DataFrame()
-    )
-    summary_parcelas_df = (
-        file.summary("parcelas_faltantes").data
-        if hasattr(file.summary("parcelas_faltantes"), "data")
-        else pd.DataFrame()
-    )
+    summary_type_df = summaries["type"].data
+    summary_local_df = summaries["local"].top(8).data
+    summary_parcelas_df = summaries["parcelas_faltantes"].data
 
     # Create category tags mapping
     category_tags = {
@@ -203,240 +199,84 @@ def generate_html_output(
         "recorrente": "tag-outros",
     }
 
+    has_name = hasattr(file, "file") and hasattr(file.file, "name")
+    tot_avista_qty = len(tot_avista.data) if not tot_avista.data.empty else 0
+    tot_parcelados_qty = (
+        len(tot_parcelados.data) if not tot_parcelados.data.empty else 0
+    )
+    tot_fin_qty = len(tot_fin.data) if not tot_fin.data.empty else 0
+
+    return {
+        "name": file.file.name if has_name else "N/A",
+        "current_month_spending": current_month_spending,
+        "month_change": month_change,
+        "tot_avista_val": tot_avista_val,
+        "tot_avista_qty": tot_avista_qty,
+        "tot_parcelados_val": tot_parcelados_val,
+        "tot_parcelados_qty": tot_parcelados_qty,
+        "total_transactions": total_transactions,
+        "next_months_data": next_months_data,
+        "monthly_data": monthly_data,
+        "categories_data": categories_data,
+        "daily_data": daily_data,
+        "summary_table": generate_summary_table(summary_type_df, category_tags),
+        "locations_table": generate_locations_table(summary_local_df),
+        "installments_table": generate_installments_table(
+            tot_avista_val,
+            tot_parcelados_val,
+            tot_fin_val,
+            tot_recorrente_val,
+            tot_avista_qty,
+            tot_parcelados_qty,
+            tot_fin_qty,
+            tot_recorrente_qty,
+        ),
+        "parcelas_table": generate_parcelas_breakdown_table(segments),
+        "top_expenses_table": generate_top_expenses_by_category(
+            top_by_type, summary_type_df
+        ),
+        "transactions_table": (
+            generate_transactions_table(transactions)
+            if transactions is not None
+            else ""
+        ),
+    }
+
+
+def render_html(
+    name: str,
+    current_month_spending: float,
+    month_change: float,
+    tot_avista_val: float,
+    tot_avista_qty: int,
+    tot_parcelados_val: float,
+    tot_parcelados_qty: int,
+    total_transactions: int,
+    next_months_data: dict,
+    monthly_data: dict,
+    categories_data: list[dict],
+    daily_data: dict,
+    summary_table: str,
+    locations_table: str,
+    installments_table: str,
+    parcelas_table: str,
+    top_expenses_table: str,
+    transactions_table: str,
+    assets: str = "cdn",
+) -> str:
     html_template = f"""<!DOCTYPE html>
 <html lang="pt-BR">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>C6 Credit Card Analysis</title>
-    <script src="https://cdn.plot.ly/plotly-3.0.1.min.js" charset="utf-8"></script>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            color: #333;
-        }}
-
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-
-        .header {{
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(20px);
-            border-radius: 20px;
-            padding: 40px;
-            margin-bottom: 30px;
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
-            text-align: center;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }}
-
-        .header h1 {{
-            font-size: 3rem;
-            font-weight: 700;
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            margin-bottom: 10px;
-            letter-spacing: -1px;
-        }}
-
-        .header h2 {{
-            font-size: 1.2rem;
-            color: #666;
-            font-weight: 400;
-        }}
-
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }}
-
-        .stat-card {{
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(20px);
-            border-radius: 20px;
-            padding: 30px;
-            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.1);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            transition: all 0.3s ease;
-        }}
-
-        .stat-card:hover {{
-            transform: translateY(-5px);
-            box-shadow: 0 25px 50px rgba(0, 0, 0, 0.15);
-        }}
-
-        .stat-card h3 {{
-            font-size: 0.9rem;
-            color: #666;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            margin-bottom: 10px;
-            font-weight: 600;
-        }}
-
-        .stat-value {{
-            font-size: 2.5rem;
-            font-weight: 700;
-            color: #333;
-            margin-bottom: 10px;
-        }}
-
-        .stat-change {{
-            font-size: 0.9rem;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-weight: 500;
-        }}
-
-        .positive {{ background: #e8f5e8; color: #2d6e2d; }}
-        .negative {{ background: #fdeaea; color: #c53030; }}
-
-        .chart-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(500px, 1fr));
-            gap: 30px;
-            margin-bottom: 40px;
-        }}
-
-        .chart-container {{
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(20px);
-            border-radius: 20px;
-            padding: 30px;
-            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.1);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }}
-
-        .chart-title {{
-            font-size: 1.4rem;
-            font-weight: 600;
-            margin-bottom: 20px;
-            color: #333;
-        }}
-
-        .table-container {{
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(20px);
-            border-radius: 20px;
-            padding: 30px;
-            margin-bottom: 30px;
-            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.1);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            overflow-x: auto;
-        }}
-
-        .section-title {{
-            font-size: 2rem;
-            font-weight: 700;
-            margin-bottom: 30px;
-            color: #333;
-            text-align: center;
-        }}
-
-        .sub-section-title {{
-            font-size: 1.5rem;
-            font-weight: 600;
-            margin-top: 20px;
-            margin-bottom: 15px;
-            color: #333;
-            text-align: center;
-        }}
-
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            font-size: 0.9rem;
-        }}
-
-        th {{
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            color: white;
-            padding: 15px;
-            text-align: left;
-            font-weight: 600;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            font-size: 0.8rem;
-        }}
-
-        th:first-child {{ border-top-left-radius: 10px; }}
-        th:last-child {{ border-top-right-radius: 10px; }}
-
-        td {{
-            padding: 12px 15px;
-            border-bottom: 1px solid #f0f0f0;
-        }}
-
-        tr:hover {{
-            background: rgba(102, 126, 234, 0.05);
-        }}
-
-        tr:last-child td {{
-            border-bottom: none;
-        }}
-
-        .currency {{
-            font-weight: 600;
-            color: #2d6e2d;
-        }}
-
-        .category-tag {{
-            display: inline-block;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 0.8rem;
-            font-weight: 500;
-            margin-right: 5px;
-        }}
-
-        .tag-alimentacao {{ background: #fef7e0; color: #b45309; }}
-        .tag-transporte {{ background: #e0f2fe; color: #0369a1; }}
-        .tag-lazer {{ background: #f3e8ff; color: #7c3aed; }}
-        .tag-saude {{ background: #ecfdf5; color: #059669; }}
-        .tag-outros {{ background: #f3f4f6; color: #374151; }}
-
-        @keyframes fadeInUp {{
-            from {{
-                opacity: 0;
-                transform: translateY(30px);
-            }}
-            to {{
-                opacity: 1;
-                transform: translateY(0);
-            }}
-        }}
-
-        .animate-in {{
-            animation: fadeInUp 0.6s ease-out;
-        }}
-
-        @media (max-width: 768px) {{
-            .header h1 {{ font-size: 2rem; }}
-            .container {{ padding: 15px; }}
-            .chart-grid {{ grid-template-columns: 1fr; }}
-            .stat-card {{ padding: 20px; }}
-        }}
-    </style>
+{_head(assets)}
 </head>
 <body>
     <div class="container">
         <div class="header animate-in">
             <h1>C6 Credit Card Analysis</h1>
-            <h2>Relatório para arquivo: {file.file.name if hasattr(file, "file") and hasattr(file.file, "name") else "N/A"}</h2>
+            <h2>Relatório para arquivo: {name}</h2>
         </div>
 
         <div class="stats-grid animate-in">
@@ -448,12 +288,12 @@ def generate_html_output(
             <div class="stat-card">
                 <h3>Compras à Vista</h3>
                 <div class="stat-value">R$ {tot_avista_val:,.2f}</div>
-                <span class="stat-change positive">{len(tot_avista.data) if not tot_avista.data.empty else 0} transações</span>
+                <span class="stat-change positive">{tot_avista_qty} transações</span>
             </div>
             <div class="stat-card">
                 <h3>Compras Parceladas</h3>
                 <div class="stat-value">R$ {tot_parcelados_val:,.2f}</div>
-                <span class="stat-change negative">{len(tot_parcelados.data) if not tot_parcelados.data.empty else 0} transações</span>
+                <span class="stat-change negative">{tot_parcelados_qty} transações</span>
             </div>
             <div class="stat-card">
                 <h3>Número de Transações</h3>
@@ -463,43 +303,47 @@ def generate_html_output(
         </div>
 
         <div class="chart-grid animate-in">
-            {'<div class="chart-container"><div class="chart-title">Gastos Próximos Meses</div><div id="nextMonthsChart"></div></div>' if xs_next_months and ys_next_months else ""}
-            {'<div class="chart-container"><div class="chart-title">Gastos por Mês</div><div id="monthlyChart"></div></div>' if xs_data_total and ys_data_total else ""}
+            {'<div class="chart-container"><div class="chart-title">Gastos Próximos Meses</div><div id="nextMonthsChart"></div></div>' if next_months_data["x"] else ""}
+            {'<div class="chart-container"><div class="chart-title">Gastos por Mês</div><div id="monthlyChart"></div></div>' if monthly_data["x"] else ""}
         </div>
 
         {'<div class="chart-container animate-in" style="margin-bottom: 30px;"><div class="chart-title">Gastos das Categorias por Mês</div><div id="categoriesChart"></div></div>' if categories_data else ""}
 
+        {'<div class="chart-container animate-in" style="margin-bottom: 30px;"><div class="chart-title">Gastos por Dia</div><div id="dailyChart"></div></div>' if daily_data["x"] else ""}
+
         <h2 class="section-title animate-in">Análises Detalhadas</h2>
         <div class="chart-grid animate-in">
             <div class="table-container">
                 <h4 class="sub-section-title">Resumo por Categoria</h4>
-                {generate_summary_table(summary_type_df, category_tags)}
+                {summary_table}
             </div>
             <div class="table-container">
                 <h4 class="sub-section-title">Top Locais de Compra</h4>
-                {generate_locations_table(summary_local_df)}
+                {locations_table}
             </div>
             <div class="table-container">
                 <h4 class="sub-section-title">Análise de Parcelas</h4>
-                {generate_installments_table(tot_avista_val, tot_parcelados_val, tot_fin_val, tot_recorrente_val, len(tot_avista.data) if not tot_avista.data.empty else 0, len(tot_parcelados.data) if not tot_parcelados.data.empty else 0, len(tot_fin.data) if not tot_fin.data.empty else 0, tot_recorrente_qty)}
+                {installments_table}
             </div>
             <div class="table-container">
                 <h4 class="sub-section-title">Detalhe de Parcelas</h4>
-                {generate_parcelas_breakdown_table(file)}
+                {parcelas_table}
             </div>
         </div>
 
         <h2 class="section-title animate-in">Top Gastos por Categoria</h2>
         <div class="chart-grid animate-in">
-            {generate_top_expenses_by_category(file, summary_type_df)}
+            {top_expenses_table}
         </div>
+        {transactions_table}
     </div>
 
     <script>
         // Chart data from Python
-        const nextMonthsData = {next_months_data};
-        const monthlyData = {monthly_data};
-        const categoriesData = {categories_data};
+        const nextMonthsData = {_json(next_months_data)};
+        const monthlyData = {_json(monthly_data)};
+        const categoriesData = {_json(categories_data)};
+        const dailyData = {_json(daily_data)};
 
         const layout = {{
             paper_bgcolor: 'rgba(0,0,0,0)',
@@ -599,6 +443,18 @@ def generate_html_output(
             Plotly.newPlot('categoriesChart', traces, layout_date, config);
         }}
 
+        if (dailyData.x && dailyData.x.length > 0) {{
+            const dailyTrace = {{
+                x: dailyData.x,
+                y: dailyData.y,
+                type: 'scatter',
+                mode: 'lines',
+                name: 'Gastos por Dia',
+                line: {{ color: '#667eea', width: 2 }}
+            }};
+            Plotly.newPlot('dailyChart', [dailyTrace], layout_date, config);
+        }}
+
         // Add scroll animations
         const observerOptions = {{
             threshold: 0.1,
@@ -637,6 +493,86 @@ def generate_html_output(
     return html_template
 
 
+def _series(xs, ys, date_format: Optional[str] = None) -> dict:
+    # Cents and short dates keep the chart payload small
+    if date_format is not None:
+        xs = pd.DatetimeIndex(xs).strftime(date_format)
+    return {"x": list(xs), "y": np.round(np.asarray(ys, dtype=float), 2).tolist()}
+
+
+def _json(data) -> str:
+    return dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_assets(folder: Path) -> Path:
+    """Writes plotly.js and the report CSS into `folder`/assets, once."""
+    assets = Path(folder) / ASSETS_DIR
+    assets.mkdir(parents=True, exist_ok=True)
+    # The bundle is named after the plotly version, so it is written once
+    if not (assets / PLOTLY_JS).is_file():
+        (assets / PLOTLY_JS).write_text(get_plotlyjs(), encoding="utf-8")
+    css = assets / "report.css"
+    if not css.is_file() or css.read_text() != CSS:
+        css.write_text(CSS)
+    return assets
+
+
+def _head(assets: str) -> str:
+    if assets == "shared":
+        return (
+            f'    <script src="{ASSETS_DIR}/{PLOTLY_JS}" charset="utf-8"></script>\n'
+            f'    <link rel="stylesheet" href="{ASSETS_DIR}/report.css">'
+        )
+    if assets == "inline":
+        script = f"    <script>{get_plotlyjs()}</script>"
+    elif assets == "cdn":
+        script = f'    <script src="{PLOTLY_CDN}" charset="utf-8"></script>'
+    else:
+        raise Exception(f'Unknown assets "{assets}", use {ASSETS}')
+    return f"{script}\n    <style>\n{CSS}    </style>"
+
+
+def generate_transactions_table(transactions: pd.DataFrame) -> str:
+    """Generate transactions table, laid out by the browser from columnar JSON
+
+    Rows are embedded once and sorted, filtered and paged client-side, so the
+    markup does not grow with the number of transactions.
+    """
+    # "</" is escaped so no value can close the script element
+    payload = _json(_columnar(transactions)).replace("</", "<\\/")
+    return f"""
+        <h2 class="section-title animate-in">Transações</h2>
+        <div class="table-container animate-in">
+            <div class="table-tools">
+                <input id="transactionsFilter" type="search" placeholder="Filtrar">
+                <span id="transactionsPage"></span>
+                <button id="transactionsPrev" type="button">&lsaquo;</button>
+                <button id="transactionsNext" type="button">&rsaquo;</button>
+            </div>
+            <table id="transactionsTable"><thead></thead><tbody></tbody></table>
+            <script id="transactionsData" type="application/json">{payload}</script>
+            <script>{TRANSACTIONS_JS}</script>
+        </div>
+    """
+
+
+def _columnar(data: pd.DataFrame) -> dict:
+    # Repeated values (dates, merchants, categories) are sent once per column
+    columns = {}
+    for name, column in data.items():
+        if column.dtype.kind == "M":
+            column = column.dt.strftime("%Y-%m" if name == "month" else "%Y-%m-%d")
+        if column.dtype.kind == "f":
+            columns[name] = column.round(2).to_numpy(float).tolist()
+        elif column.dtype.kind in "iu":
+            columns[name] = column.to_numpy(int).tolist()
+        else:
+            codes, values = pd.factorize(column.astype(str))
+            columns[name] = {"codes": codes.tolist(), "values": values.tolist()}
+    labels = {name: COLUMN_LABELS.get(name, name) for name in data.columns}
+    return {"columns": list(data.columns), "labels": labels, "data": columns}
+
+
 def generate_summary_table(summary_df, category_tags):
     """Generate summary table HTML"""
     if summary_df.empty:
@@ -763,56 +699,35 @@ def generate_installments_table(
     return html
 
 
-def generate_parcelas_breakdown_table(file):
+def generate_parcelas_breakdown_table(segments):
     """Generates a table showing the breakdown of parcelas (installments)."""
-    df = file._df.copy()
-
-    # Filter out recurrent transactions for this breakdown
-    df_non_recurrent = df[df["type"] != "recorrente"].copy()
+    # Recurrent transactions are left out of this breakdown
+    df_non_recurrent = pd.concat(
+        [segments[s].data for s in ("avista", "parcelados", "finalizados")]
+    )
 
     if df_non_recurrent.empty:
         return "<p>Dados de parcelas não disponíveis</p>"
 
-    # Create a 'parcelas_display' column based on parcelas_faltantes
-    def get_parcela_display_simplified(row):
-        if row["parcelas_faltantes"] == 0 and row["parcelas_totais"] == 0:
-            return "À vista"
-        else:
-            return f"{row['parcelas_faltantes']} restantes"
-
-    df_non_recurrent["parcelas_display"] = df_non_recurrent.apply(
-        get_parcela_display_simplified, axis=1
+    # 'À vista' first, then by remaining installments as an ordered categorical
+    faltantes = df_non_recurrent["parcelas_faltantes"].to_numpy()
+    avista = (faltantes == 0) & (df_non_recurrent["parcelas_totais"].to_numpy() == 0)
+    restantes, codes = np.unique(faltantes[~avista], return_inverse=True)
+    display_codes = np.zeros(len(faltantes), dtype=int)
+    display_codes[~avista] = codes + 1
+    parcelas_display = pd.Categorical.from_codes(
+        display_codes,
+        categories=["À vista", *(f"{n} restantes" for n in restantes)],
+        ordered=True,
     )
 
-    # Group by the new display column
     parcelas_summary = (
-        df_non_recurrent.groupby(["parcelas_faltantes", "parcelas_display"])
+        df_non_recurrent.groupby(parcelas_display, observed=True)
         .agg(qtd=("valor", "size"), tot_value=("valor", "sum"))
+        .rename_axis("parcelas_display")
         .reset_index()
     )
 
-    # Custom sort for 'À vista' first, then numerically by remaining installments
-    def custom_sort_key_simplified(parcela_str):
-        if parcela_str == "À vista":
-            return (0, 0)
-        elif parcela_str.startswith("Parcelado ("):
-            try:
-                # Extract number of remaining installments
-                num_remaining_str = parcela_str.split("(")[1].split(" ")[0]
-                num_remaining = int(num_remaining_str)
-                return (1, num_remaining)
-            except ValueError:
-                return (1, 999)  # Fallback for unparseable
-        else:
-            return (2, 0)  # For "Outros" or anything else
-
-    parcelas_summary["sort_key"] = parcelas_summary["parcelas_display"].apply(
-        custom_sort_key_simplified
-    )
-    parcelas_summary = parcelas_summary.sort_values(by="sort_key").drop(
-        columns="sort_key"
-    )
-
     html = """
     <table>
         <thead>
@@ -854,7 +769,7 @@ def generate_parcelas_breakdown_table(file):
     return html
 
 
-def generate_top_expenses_by_category(file, summary_df):
+def generate_top_expenses_by_category(top_by_type, summary_df):
     """Generate top expenses by category section"""
     html = ""
 
@@ -863,10 +778,10 @@ def generate_top_expenses_by_category(file, summary_df):
             tp = row.get("type", "")
             if tp and tp != "total":
                 try:
-                    tp_data_selected = file.select(type=tp)
-                    if not tp_data_selected.data.empty:
-                        qtd_compras = tp_data_selected.data.shape[0]
-                        tp_value = tp_data_selected.data.valor.sum()
+                    tp_data_selected = top_by_type.get(tp)
+                    if tp_data_selected is not None and not tp_data_selected.data.empty:
+                        qtd_compras = row.get("qtd", tp_data_selected.data.shape[0])
+                        tp_value = row.get("tot_value", tp_data_selected.data.valor.sum())
 
                         html += f"""
                         <div class="table-container">
@@ -883,13 +798,9 @@ def generate_top_expenses_by_category(file, summary_df):
                         """
 
                         # Get top 10 expenses for this category
-                        top_expenses = (
-                            tp_data_selected.top(10).data
-                            if tp != "others"
-                            else tp_data_selected.data
-                        )
+                        top_expenses = tp_data_selected.top(10).data
 
-                        for _, expense_row in top_expenses.head(10).iterrows():
+                        for _, expense_row in top_expenses.iterrows():
                             # 'type' column is used for description, 'local' for local, etc.
                             # Assuming 'type' in expense_row refers to the transaction description, not category type
                             local = expense_row.get("local", "N/A")
@@ -923,3 +834,323 @@ def generate_top_expenses_by_category(file, summary_df):
                     html += f"<p>Erro ao processar categoria {tp}: {e}</p>"
 
     return html
+
+
+ASSETS = ["cdn", "shared", "inline"]
+ASSETS_DIR = "assets"
+# Named after the plotly.js bundled with plotly, not plotly's own version
+PLOTLY_JS = f"plotly-{get_plotlyjs_version()}.min.js"
+PLOTLY_CDN = f"https://cdn.plot.ly/{PLOTLY_JS}"
+COLUMN_LABELS = {
+    "card": "Cartão",
+    "month": "Fatura",
+    "data": "Data",
+    "local": "Local",
+    "type": "Categoria",
+    "valor": "Valor",
+    "parcela": "Parcela",
+    "parcelas_totais": "Parcelas",
+}
+PAGE_SIZE = 50
+TRANSACTIONS_JS = """
+        (() => {
+            const payload = JSON.parse(document.getElementById('transactionsData').textContent);
+            const names = payload.columns;
+            const columns = names.map(name => {
+                const column = payload.data[name];
+                return column.codes ? column.codes.map(code => column.values[code]) : column;
+            });
+            const count = columns.length ? columns[0].length : 0;
+            const text = Array.from({ length: count }, (_, i) => columns.map(c => c[i]).join(' ').toLowerCase());
+            const table = document.getElementById('transactionsTable');
+            const filter = document.getElementById('transactionsFilter');
+            const status = document.getElementById('transactionsPage');
+            const size = PAGE_SIZE;
+            const escape = value => String(value).replace(/[&<>"]/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;' })[c]);
+            const money = value => 'R$ ' + value.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+            let rows = [], sortBy = names.indexOf('valor'), descending = true, page = 0;
+
+            function render() {
+                const start = page * size;
+                table.tBodies[0].innerHTML = rows.slice(start, start + size).map(i => '<tr>' + names.map((name, c) =>
+                    name === 'valor' ? `<td class="currency">${money(columns[c][i])}</td>` : `<td>${escape(columns[c][i])}</td>`
+                ).join('') + '</tr>').join('');
+                status.textContent = rows.length ? `${start + 1}-${Math.min(start + size, rows.length)} de ${rows.length}` : '0 de 0';
+            }
+
+            function update() {
+                const query = filter.value.trim().toLowerCase();
+                rows = [];
+                for (let i = 0; i < count; i++) {
+                    if (!query || text[i].includes(query)) rows.push(i);
+                }
+                if (sortBy >= 0) {
+                    const column = columns[sortBy], sign = descending ? -1 : 1;
+                    rows.sort((a, b) => (column[a] < column[b] ? -1 : column[a] > column[b] ? 1 : 0) * sign);
+                }
+                page = Math.min(page, Math.max(0, Math.ceil(rows.length / size) - 1));
+                render();
+            }
+
+            table.tHead.innerHTML = '<tr>' + names.map((name, c) => `<th data-col="${c}">${escape(payload.labels[name])}</th>`).join('') + '</tr>';
+            table.tHead.addEventListener('click', event => {
+                const c = Number(event.target.dataset.col);
+                if (Number.isNaN(c)) return;
+                descending = c === sortBy ? !descending : false;
+                sortBy = c;
+                update();
+            });
+            filter.addEventListener('input', () => { page = 0; update(); });
+            document.getElementById('transactionsPrev').addEventListener('click', () => { page = Math.max(0, page - 1); render(); });
+            document.getElementById('transactionsNext').addEventListener('click', () => {
+                if ((page + 1) * size < rows.length) { page += 1; render(); }
+            });
+            update();
+        })();
+""".replace("PAGE_SIZE", str(PAGE_SIZE))
+CSS = """        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+
+        body {
+            font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh;
+            color: #333;
+        }
+
+        .container {
+            max-width: 1400px;
+            margin: 0 auto;
+            padding: 20px;
+        }
+
+        .header {
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(20px);
+            border-radius: 20px;
+            padding: 40px;
+            margin-bottom: 30px;
+            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
+            text-align: center;
+            border: 1px solid rgba(255, 255, 255, 0.2);
+        }
+
+        .header h1 {
+            font-size: 3rem;
+            font-weight: 700;
+            background: linear-gradient(135deg, #667eea, #764ba2);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            margin-bottom: 10px;
+            letter-spacing: -1px;
+        }
+
+        .header h2 {
+            font-size: 1.2rem;
+            color: #666;
+            font-weight: 400;
+        }
+
+        .stats-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
+            gap: 20px;
+            margin-bottom: 30px;
+        }
+
+        .stat-card {
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(20px);
+            border-radius: 20px;
+            padding: 30px;
+            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.1);
+            border: 1px solid rgba(255, 255, 255, 0.2);
+            transition: all 0.3s ease;
+        }
+
+        .stat-card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 25px 50px rgba(0, 0, 0, 0.15);
+        }
+
+        .stat-card h3 {
+            font-size: 0.9rem;
+            color: #666;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+            margin-bottom: 10px;
+            font-weight: 600;
+        }
+
+        .stat-value {
+            font-size: 2.5rem;
+            font-weight: 700;
+            color: #333;
+            margin-bottom: 10px;
+        }
+
+        .stat-change {
+            font-size: 0.9rem;
+            padding: 4px 12px;
+            border-radius: 20px;
+            font-weight: 500;
+        }
+
+        .positive { background: #e8f5e8; color: #2d6e2d; }
+        .negative { background: #fdeaea; color: #c53030; }
+
+        .chart-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(500px, 1fr));
+            gap: 30px;
+            margin-bottom: 40px;
+        }
+
+        .chart-container {
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(20px);
+            border-radius: 20px;
+            padding: 30px;
+            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.1);
+            border: 1px solid rgba(255, 255, 255, 0.2);
+        }
+
+        .chart-title {
+            font-size: 1.4rem;
+            font-weight: 600;
+            margin-bottom: 20px;
+            color: #333;
+        }
+
+        .table-container {
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(20px);
+            border-radius: 20px;
+            padding: 30px;
+            margin-bottom: 30px;
+            box-shadow: 0 15px 35px rgba(0, 0, 0, 0.1);
+            border: 1px solid rgba(255, 255, 255, 0.2);
+            overflow-x: auto;
+        }
+
+        .section-title {
+            font-size: 2rem;
+            font-weight: 700;
+            margin-bottom: 30px;
+            color: #333;
+            text-align: center;
+        }
+
+        .sub-section-title {
+            font-size: 1.5rem;
+            font-weight: 600;
+            margin-top: 20px;
+            margin-bottom: 15px;
+            color: #333;
+            text-align: center;
+        }
+
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 0.9rem;
+        }
+
+        th {
+            background: linear-gradient(135deg, #667eea, #764ba2);
+            color: white;
+            padding: 15px;
+            text-align: left;
+            font-weight: 600;
+            text-transform: uppercase;
+            letter-spacing: 0.5px;
+            font-size: 0.8rem;
+        }
+
+        th:first-child { border-top-left-radius: 10px; }
+        th:last-child { border-top-right-radius: 10px; }
+
+        td {
+            padding: 12px 15px;
+            border-bottom: 1px solid #f0f0f0;
+        }
+
+        tr:hover {
+            background: rgba(102, 126, 234, 0.05);
+        }
+
+        tr:last-child td {
+            border-bottom: none;
+        }
+
+        .currency {
+            font-weight: 600;
+            color: #2d6e2d;
+        }
+
+        .category-tag {
+            display: inline-block;
+            padding: 4px 12px;
+            border-radius: 20px;
+            font-size: 0.8rem;
+            font-weight: 500;
+            margin-right: 5px;
+        }
+
+        .tag-alimentacao { background: #fef7e0; color: #b45309; }
+        .tag-transporte { background: #e0f2fe; color: #0369a1; }
+        .tag-lazer { background: #f3e8ff; color: #7c3aed; }
+        .tag-saude { background: #ecfdf5; color: #059669; }
+        .tag-outros { background: #f3f4f6; color: #374151; }
+
+        @keyframes fadeInUp {
+            from {
+                opacity: 0;
+                transform: translateY(30px);
+            }
+            to {
+                opacity: 1;
+                transform: translateY(0);
+            }
+        }
+
+        .animate-in {
+            animation: fadeInUp 0.6s ease-out;
+        }
+
+        .table-tools {
+            display: flex;
+            align-items: center;
+            gap: 10px;
+            margin-bottom: 15px;
+        }
+
+        .table-tools input {
+            flex: 1;
+            padding: 10px 15px;
+            border: 1px solid #e0e0e0;
+            border-radius: 10px;
+            font: inherit;
+        }
+
+        .table-tools button {
+            padding: 8px 14px;
+            border: none;
+            border-radius: 10px;
+            background: linear-gradient(135deg, #667eea, #764ba2);
+            color: white;
+            cursor: pointer;
+        }
+
+        th[data-col] { cursor: pointer; }
+
+        @media (max-width: 768px) {
+            .header h1 { font-size: 2rem; }
+            .container { padding: 15px; }
+            .chart-grid { grid-template-columns: 1fr; }
+            .stat-card { padding: 20px; }
+        }
+"""
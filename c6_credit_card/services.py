@@ -1,23 +1,94 @@
 from logging import getLogger
 from os import getenv
+from typing import Optional
 
 import numpy as np
 import pandas as pd
 
-from c6_credit_card.data.file import File
+from c6_credit_card.data.file import SEGMENTS, File
 from c6_credit_card.data.files import Files
+from c6_credit_card.data.mapping import Mapping, layers
+from c6_credit_card.data.result import Result
 
 LOG = getLogger(__name__)
+MAX_POINTS = 500
+TRANSACTIONS = ["month", "data", "local", "type", "valor", "parcela", "parcelas_totais"]
 
 
-def read_files(pasta, force):
-    files = Files(pasta)
+def read_files(
+    pasta,
+    force,
+    extractor="tabula",
+    since=None,
+    until=None,
+    cache="parquet",
+    mappings=(),
+    cards=None,
+):
+    files = Files(pasta, since, until, cache, cards)
     LOG.info(files)
     pswd = getenv("password") or input("Senha do arquivo: ")
-    files.process(pswd, force=force)
+    mapping = Mapping([*layers(pasta), *mappings])
+    files.process(pswd, mapping, force=force, extractor=extractor)
     return files
 
 
+def report_data(
+    files: Files,
+    history: bool = False,
+    max_points: Optional[int] = MAX_POINTS,
+    html: bool = True,
+) -> dict:
+    """Everything the renderers show about the latest bill of `files`.
+
+    The daily series, of at most `max_points` points, and with `history` the
+    transactions of every bill, are only shown by the `html` report.
+    """
+    file = files[-1]
+    ys_next_months, xs_next_months = plot_next_months(files)
+    ys_data_total, xs_data_total = plot_data_total(files)
+    ys_data_type, xs_data_type, tps_data_type = plot_data_type(files)
+    top_by_type = top_expenses_by_type(file)
+    segments = segment_expenses(file)
+    data = {
+        "file": file,
+        "ys_next_months": ys_next_months,
+        "xs_next_months": xs_next_months,
+        "ys_data_total": ys_data_total,
+        "xs_data_total": xs_data_total,
+        "ys_data_type": ys_data_type,
+        "xs_data_type": xs_data_type,
+        "tps_data_type": tps_data_type,
+        "top_by_type": {k: hide_card(files, r) for k, r in top_by_type.items()},
+        "segments": {k: hide_card(files, r) for k, r in segments.items()},
+        "summaries": summaries(files),
+    }
+    if html:
+        ys_daily, xs_daily = plot_daily(files, max_points)
+        data["ys_daily"], data["xs_daily"] = ys_daily, xs_daily
+        data["transactions"] = transactions(files) if history else None
+    return data
+
+
+def summaries(files: Files) -> dict[str, Result]:
+    """Totals of the latest bill by type, merchant and installments left.
+
+    Type and merchant totals are rolled up from the cube; installments left
+    are not one of its dimensions, so they are summed from the bill's rows.
+    """
+    return {
+        "type": files.summary("type"),
+        "local": files.summary("local"),
+        "parcelas_faltantes": files[-1].summary("parcelas_faltantes"),
+    }
+
+
+def transactions(files: Files) -> pd.DataFrame:
+    """Every purchase of the loaded bills, newest bill first."""
+    columns = TRANSACTIONS if len(files.cards) == 1 else ["card", *TRANSACTIONS]
+    return pd.concat([f._df[columns] for f in reversed(list(files))], ignore_index=True)
+
+
 def plot_data_total(files: Files):
     values: pd.DataFrame = files.summary_all().reset_index().sort_values("month")
 
@@ -26,97 +97,166 @@ def plot_data_total(files: Files):
     return ys, xs
 
 
-def plot_next_months(file: File):
-    recorrentes = file._df.query('type == "recorrente"').valor.sum()
-    parcelas = (
-        file._df.query("parcela > 0 and parcelas_faltantes > 0")
-        .groupby("parcelas_faltantes")["valor"]
-        .sum()
-    )
-
-    parcelas = parcelas.sort_index(ascending=False).cumsum().sort_index()
+def plot_next_months(files: Files, horizon: Optional[int] = None):
+    total = project_next_months(files, horizon)["total"]
 
-    if not parcelas.empty:
-        max_index = parcelas.index.max()
-    else:
-        max_index = 0
+    ys = total.to_numpy().tolist()
+    xs = list(range(len(ys)))
+    return ys, xs
 
-    arr = np.full(max_index + 1, np.nan)
 
-    for idx, value in parcelas.items():
-        arr[idx] = value
+def project_next_months(
+    files: Files, horizon: Optional[int] = None
+) -> dict[str, pd.DataFrame]:
+    """
+    Projects the next `horizon` months of spending from the whole bill history.
+    Open installments come from the ledger, which links them across bills and
+    drops the ones missing from the latest bill, and recurring charges come
+    from the latest bill; both are laid out as one (purchase x month) matrix and rolled up to
+    'total', per category ('type') and per merchant ('local').
+    """
+    last = files[-1]
+    installments = files.ledger.open()
+    recorrentes = last._df.query('type == "recorrente"')
 
-    parcelas = pd.Series(arr[1:], name="parcelas_faltantes").ffill().fillna(0)
+    if horizon is None:
+        horizon = int(installments["remaining"].max()) if len(installments) else 0
 
-    parcelas_rec = parcelas + recorrentes
+    remaining = np.concatenate(
+        [
+            installments["remaining"].to_numpy(dtype=int),
+            np.full(len(recorrentes), horizon, dtype=int),
+        ]
+    )
+    valor = np.concatenate(
+        [installments["valor"].to_numpy(float), recorrentes["valor"].to_numpy(float)]
+    )
+    months = np.arange(1, horizon + 1)
+    matrix = np.where(remaining[:, None] >= months[None, :], valor[:, None], 0.0)
 
-    # print(f"total parcelas: R${parcelas.sum():,.2f} | recorrente: R${recorrentes:,.2f}")
-    # print(
-    #     pd.DataFrame(
-    #         {"parcelas": parcelas, "recorrente": recorrentes, "total": parcelas_rec}
-    #     )
-    # )
+    columns = pd.date_range(
+        pd.Timestamp(last.month) + pd.DateOffset(months=1), periods=horizon, freq="MS"
+    )
+    projections = {"total": pd.Series(matrix.sum(axis=0), index=columns)}
+    for by in ("type", "local"):
+        keys = np.concatenate([installments[by].to_numpy(), recorrentes[by].to_numpy()])
+        codes, uniques = pd.factorize(keys)
+        rollup = np.zeros((len(uniques), horizon))
+        np.add.at(rollup, codes, matrix)
+        projections[by] = pd.DataFrame(
+            rollup, index=pd.Index(uniques, name=by), columns=columns
+        )
 
-    ys = parcelas_rec.values.tolist()
-    xs = parcelas_rec.index.tolist()
-    return ys, xs
+    return projections
 
 
-def plot_data_type(files):  # files: Files
+def plot_data_type(files, top_n: int = 5):  # files: Files
     """
     Prepares data for plotting spending by category over time.
-    It identifies the top 5 spending categories and groups the rest into an 'outros' category.
+    It pivots the monthly totals into a (month x type) table, keeps the `top_n`
+    spending categories and sums the remaining columns into an 'outros' category.
+    Every series shares the same month axis.
     """
     types: pd.DataFrame = files.summary_all("type").reset_index()
+    pivot = types.pivot_table(
+        index="month", columns="type", values="tot_value", aggfunc="sum", fill_value=0
+    ).sort_index()
 
-    # Calculate total spending per type to identify top categories
-    type_sums = types.groupby("type").tot_value.sum().sort_values(ascending=False)
-
-    # Determine the number of top categories to display individually
-    # We'll keep 5 top categories and group the rest into 'outros'
-    top_n = 5
-    selected_types_list = type_sums.head(top_n).index.tolist()
-
-    tps = []
-    ys = []
-    xs = []
-
-    # Process each of the selected top categories
-    for t in selected_types_list:
-        df_t = types[types["type"] == t].sort_values(by="month")
-        tps.append(t)
-        xs.append(df_t.month)
-        ys.append(list(df_t["tot_value"].values))
-
-    # Process the 'outros' (remainder) category
-    df_others = types[~types["type"].isin(selected_types_list)]
-    if not df_others.empty:
-        # Group remaining types by month and sum their values
-        df_others_monthly_sum = (
-            df_others.groupby("month")["tot_value"].sum().reset_index()
-        )
+    # Rank categories by total spending, top ones first
+    ranked = pivot.sum().sort_values(ascending=False, kind="stable").index
+    selected_types_list = ranked[:top_n].tolist()
+    others = ranked[top_n:]
 
-        # Ensure all months are present for 'outros' to align with other categories
-        # Get all unique months from the original 'types' DataFrame to ensure consistent x-axis
-        all_months = types["month"].unique()
-        df_others_monthly_sum = (
-            df_others_monthly_sum.set_index("month")
-            .reindex(all_months, fill_value=0)
-            .reset_index()
-        )
-        df_others_monthly_sum = df_others_monthly_sum.sort_values(by="month")
+    values = pivot[selected_types_list].to_numpy().T
+    tps = selected_types_list
+    if len(others):
+        values = np.vstack([values, pivot[others].to_numpy().sum(axis=1)])
+        tps = tps + ["outros"]
 
-        tps.append("outros")
-        xs.append(df_others_monthly_sum.month)
-        ys.append(list(df_others_monthly_sum["tot_value"].values))
+    months = pivot.index.to_numpy()
+    ys = list(values)
+    xs = [months] * len(ys)
 
     return ys, xs, tps
 
 
-def plot_gastos_por_dia(file: File):
-    data = (
-        file._df.query('type != "recorrente" and parcelas_totais == 0')
-        .groupby("data")
-        .agg(qtd=("data", "count"), tot=("valor", "sum"))
-    )
-    return data.tot, data.index.strftime("%d").astype(int)
+def top_expenses_by_type(file: File, top: int = 10) -> dict[str, Result]:
+    """
+    Top expenses of each category from a single groupby, shared by the renderers.
+    Uncategorized ('others') purchases are kept whole so they can be reviewed.
+    """
+    return file.top_by("type", top, keep_all=["others"])
+
+
+def hide_card(files: Files, result: Result) -> Result:
+    """`result` without its card column when a single card is loaded."""
+    if len(files.cards) > 1:
+        return result
+    return Result(result.data.drop(columns="card", errors="ignore"))
+
+
+def segment_expenses(file: File) -> dict[str, Result]:
+    """
+    Splits the bill into the installment segments shown by the reports
+    ('avista', 'parcelados', 'finalizados' and 'recorrente') in a single pass.
+    """
+    order = np.argsort(-file._df["valor"].to_numpy(), kind="stable")
+    data = file._df.iloc[order]
+    segment = file.segment()[order]
+    groups = dict(list(data.groupby(segment, sort=False)))
+    return {s: Result(groups.get(s, data.iloc[:0])) for s in SEGMENTS}
+
+
+def plot_daily(files: Files, max_points: Optional[int] = MAX_POINTS):
+    """
+    Daily one-off spending over every loaded bill, by purchase date.
+    Above `max_points` days the series is downsampled with LTTB, which keeps
+    its peaks and overall shape.
+    """
+    data = pd.concat([_daily(f) for f in files]).groupby(level=0).tot.sum()
+    ys, xs = data.to_numpy(float), data.index
+    if max_points is not None:
+        keep = lttb(xs.to_numpy("datetime64[ns]").astype(float), ys, max_points)
+        ys, xs = ys[keep], xs[keep]
+    return ys.tolist(), xs
+
+
+def _purchase_dates(dates: pd.Series, month) -> pd.DatetimeIndex:
+    # PDF bills print no year, so extraction stamps the year it ran in; a
+    # purchase is in the bill's year, or the one before when its month is later
+    dates = pd.DatetimeIndex(pd.to_datetime(dates.to_numpy()))
+    year = month.year - (dates.month > month.month)
+    parts = pd.DataFrame({"year": year, "month": dates.month, "day": dates.day})
+    return pd.DatetimeIndex(pd.to_datetime(parts, errors="coerce"))
+
+
+def lttb(xs: np.ndarray, ys: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Positions of the points kept by Largest-Triangle-Three-Buckets downsampling.
+    The first and last points are kept; the ones between are split into
+    `threshold - 2` buckets, and from each the point forming the largest
+    triangle with the previous kept point and the next bucket's mean is kept.
+    """
+    n = len(xs)
+    if n <= threshold or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    edges = np.append(edges, n)
+    kept = [0]
+    for start, end, following in zip(edges[:-2], edges[1:-1], edges[2:]):
+        mean_x, mean_y = xs[end:following].mean(), ys[end:following].mean()
+        a = kept[-1]
+        area = np.abs(
+            (xs[a] - mean_x) * (ys[start:end] - ys[a])
+            - (xs[a] - xs[start:end]) * (mean_y - ys[a])
+        )
+        kept.append(start + int(area.argmax()))
+    kept.append(n - 1)
+    return np.array(kept)
+
+
+def _daily(file: File) -> pd.DataFrame:
+    data = file._df.query('type != "recorrente" and parcelas_totais == 0')
+    data = data.assign(data=_purchase_dates(data["data"], file.month))
+    return data.groupby("data").agg(qtd=("data", "count"), tot=("valor", "sum"))
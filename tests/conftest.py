@@ -0,0 +1,9 @@
+import pytest
+
+import c6_credit_card.data.mapping as mapping_module
+
+
+@pytest.fixture(autouse=True)
+def user_mapping(tmp_path, monkeypatch):
+    """Keeps the developer's own mapping out of every test."""
+    monkeypatch.setattr(mapping_module, 'USER_FILE', tmp_path / 'user' / 'mapping.json')
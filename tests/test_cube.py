@@ -0,0 +1,70 @@
+import pandas as pd
+
+from c6_credit_card.data.cube import Cube
+from c6_credit_card.data.files import Files
+
+
+def make_bills(folder, months):
+    """Writes a dummy PDF and its extracted cache for each month."""
+    for i, month in enumerate(months):
+        month = pd.Timestamp(month)
+        df = pd.DataFrame({
+            'data': [month - pd.Timedelta(days=10)] * 3,
+            'local': ['IFOOD RESTAURANTE', 'NETFLIX COM', 'LOJA TESTE Parcela 13'],
+            'valor': [10.0 + i, 40.0, 90.0],
+            'parcela': [0, 0, 1],
+            'parcelas_totais': [0, 0, 3],
+            'parcelas_faltantes': [0, 0, 2],
+            'month': month,
+        })
+        pdf = folder / f"Fatura_{month:%Y_%m}.pdf"
+        pdf.write_bytes(b"%PDF-1.4")
+        df.to_parquet(pdf.with_suffix(".cache"))
+
+
+def test_cube_is_maintained_and_persisted(tmp_path):
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01'])
+    files = Files(str(tmp_path))
+    files.process('secret')
+
+    by_month = files.summary_all().set_index('month').sort_index()
+    assert by_month.tot_value.tolist() == [140.0, 141.0]
+    assert by_month.qtd.tolist() == [3, 3]
+
+    by_segment = files.cube.rollup('segment').set_index('segment')
+    assert by_segment.loc['parcelados', 'tot_value'] == 180.0
+    assert by_segment.loc['avista', 'qtd'] == 2
+
+    # Ingesting a bill again replaces its month instead of adding to it
+    files.cube.ingest(files[-1])
+    assert files.cube.rollup().tot_value.tolist() == [281.0]
+
+    # The cube is reloaded from disk without reprocessing the bills
+    cube = Cube(tmp_path / 'cube.cache')
+    assert len(cube.months) == 2
+    assert cube.rollup('local', ['2024-02-01']).local.tolist() == ['LOJA TESTE', 'NETFLIX', 'IFOOD']
+
+
+def test_a_run_over_fewer_cards_keeps_the_other_cards(tmp_path):
+    for card in ('ana', 'bia'):
+        (tmp_path / card).mkdir()
+        make_bills(tmp_path / card, ['2024-02-01'])
+    folders = {card: str(tmp_path / card) for card in ('ana', 'bia')}
+    Files(str(tmp_path), cards=folders).process('secret')
+
+    files = Files(str(tmp_path), cards={'ana': folders['ana']})
+    files.process('secret')
+
+    by_card = Cube(tmp_path / 'cube.cache').rollup('card').set_index('card')
+    assert by_card.tot_value.to_dict() == {'ana': 140.0, 'bia': 140.0}
+    assert files.summary_all().tot_value.tolist() == [140.0]
+
+
+def test_report_summaries_are_rolled_up_from_the_cube(tmp_path):
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01'])
+    files = Files(str(tmp_path))
+    files.process('secret')
+
+    for by in ('type', 'local'):
+        assert files.summary(by).data.equals(files[-1].summary(by).data)
+    assert files.summary('local', add_total=False).data.local.tolist() == ['LOJA TESTE', 'NETFLIX', 'IFOOD']
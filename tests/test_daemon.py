@@ -0,0 +1,78 @@
+import stat
+from threading import Thread
+
+from c6_credit_card.daemon import Client, Daemon, connect, socket_path
+from tests.test_explorer import make_explorer
+
+
+def test_daemon_serves_explorer_commands(tmp_path):
+    explorer, _ = make_explorer(tmp_path)
+    path = tmp_path / 'daemon.sock'
+    loads = []
+
+    def load():
+        loads.append(True)
+        return explorer.files
+
+    daemon = Daemon(path, explorer.files, load)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    thread = Thread(target=daemon.serve, daemon=True)
+    thread.start()
+
+    client = Client(path)
+    output, stop = client.send('summary type')
+    assert 'Total por type' in output and not stop
+
+    # The session keeps its state between commands
+    client.send('month 2024-01')
+    output, _ = client.send('month')
+    assert 'Fatura_2024_01.pdf' in output
+
+    client.send('reload')
+    assert loads == [True]
+
+    output, stop = client.send('shutdown')
+    assert stop
+    client.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert not path.exists()
+
+
+def test_an_open_session_does_not_block_other_clients(tmp_path):
+    explorer, _ = make_explorer(tmp_path)
+    path = tmp_path / 'daemon.sock'
+    daemon = Daemon(path, explorer.files, lambda: explorer.files)
+    thread = Thread(target=daemon.serve, daemon=True)
+    thread.start()
+
+    session = Client(path)
+    session.send('month 2024-01')
+    client = Client(path)
+    client._socket.settimeout(5)
+    output, _ = client.send('summary type')
+    assert 'Total por type' in output
+    client.close()
+
+    # Shutting down from another client does not wait for the open session
+    client = Client(path)
+    assert client.send('shutdown')[1]
+    client.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    session.close()
+
+
+def test_connect_without_daemon(tmp_path):
+    assert connect(str(tmp_path)) is None
+
+
+def test_socket_path_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert socket_path('faturas').parent == tmp_path
+
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    monkeypatch.setattr('c6_credit_card.daemon.gettempdir', lambda: str(tmp_path))
+    folder = socket_path('faturas').parent
+    assert folder.parent == tmp_path
+    assert stat.S_IMODE(folder.stat().st_mode) == 0o700
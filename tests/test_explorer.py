@@ -0,0 +1,55 @@
+from io import StringIO
+
+import pandas as pd
+from rich.console import Console
+
+from c6_credit_card.data.files import Files
+from c6_credit_card.explorer import Explorer
+from tests.test_cube import make_bills
+
+
+def make_explorer(folder):
+    make_bills(folder, ['2024-01-01', '2024-02-01'])
+    files = Files(str(folder))
+    files.process('secret')
+    console = Console(file=StringIO(), width=200, record=True)
+    return Explorer(files, console), console
+
+
+def test_explorer_commands_reuse_loaded_bills(tmp_path):
+    explorer, console = make_explorer(tmp_path)
+
+    explorer.onecmd('summary type')
+    explorer.onecmd('select type=comida')
+    explorer.onecmd('compare 2024-01 2024-02')
+    explorer.onecmd('remaining')
+    output = console.export_text()
+
+    assert 'Total por type' in output
+    assert '1 compras R$11.00' in output  # February's IFOOD purchase
+    assert '01/2024' in output and '02/2024' in output
+    assert 'Parcelas a pagar: R$' in output
+
+
+def test_explorer_month_and_errors(tmp_path):
+    explorer, console = make_explorer(tmp_path)
+
+    explorer.onecmd('month 2024-01')
+    assert explorer.file.month.month == 1
+
+    explorer.onecmd('month 2030-01')
+    explorer.onecmd('compare 2024-01')
+    output = console.export_text()
+    assert 'No bill for 2030-01' in output
+    assert 'compare needs two months' in output
+    assert explorer.onecmd('quit') is True
+
+
+def test_compare_only_rolls_up_the_loaded_cards(tmp_path):
+    explorer, console = make_explorer(tmp_path)
+    cube = explorer.files.cube
+    cube._df = pd.concat([cube._df, cube._df.assign(card='bia')], ignore_index=True)
+
+    explorer.onecmd('compare 2024-01 2024-02')
+    output = console.export_text()
+    assert '│ comida     │ 10.00   │ 11.00   │ 1.00 │' in output
@@ -0,0 +1,353 @@
+import json
+from datetime import datetime as date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import c6_credit_card.data.readers as readers_module
+from c6_credit_card.data.file import File
+from c6_credit_card.data.files import Files
+from c6_credit_card.data.mapping import Mapping
+from tests.test_cube import make_bills
+
+
+def test_process_pipeline_stores_bills_in_month_order(tmp_path):
+    make_bills(tmp_path, ['2024-03-01', '2024-01-01', '2024-02-01', '2024-04-01'])
+    files = Files(str(tmp_path))
+    files.process('secret', workers=3)
+
+    assert all('type' in f._df for f in files)
+    assert files.ledger.month == 2024 * 12 + 3
+    assert len(files.cube.months) == 4
+
+
+def test_process_pipeline_raises_worker_errors(tmp_path):
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01'])
+    (tmp_path / 'Fatura_2024_02.cache').write_bytes(b'not parquet')
+    files = Files(str(tmp_path))
+
+    with pytest.raises(Exception):
+        files.process('secret')
+    assert not (tmp_path / 'cube.cache').exists()
+
+
+def make_table(rows):
+    """A tabula table, which reads the first row of a page as its header."""
+    header, *rest = rows
+    return pd.DataFrame(rest, columns=header)
+
+
+def test_extract_writes_one_row_group_per_table(tmp_path, monkeypatch):
+    tables = [
+        pd.DataFrame({'resumo': [1]}),
+        make_table([['01 jan', 'IFOOD*REST', '', '10,00'], ['02 fev', 'LOJA - Parcela 2/3', '', '1.234,50']]),
+        make_table([['05 mar', 'Estorno LOJA', '', '5,00']]),
+        pd.DataFrame({'rodape': [1]}),
+    ]
+    monkeypatch.setattr(readers_module, 'read_pdf', lambda *args, **kwargs: list(tables))
+    pdf = tmp_path / 'Fatura_2024_03.pdf'
+    pdf.write_bytes(b'%PDF-1.4')
+
+    f = File(pdf, date(2024, 3, 1))
+    f.load('secret')
+
+    assert pq.ParquetFile(pdf.with_suffix('.cache')).num_row_groups == 2
+    assert f._df.valor.tolist() == [10.0, 1234.5, -5.0]
+    assert f._df.parcela.tolist() == [0, 2, 0]
+    assert f._df.parcelas_totais.tolist() == [0, 3, 0]
+
+
+CSV = """﻿Data de Compra;Nome no Cartão;Final do Cartão;Categoria;Descrição;Parcela;Valor (em US$);Cotação (em R$);Valor (em R$)
+05/02/2024;FULANO;1234;Restaurante;IFOOD *RESTAURANTE;Única;0;0;25.9
+10/01/2024;FULANO;1234;Loja;LOJA TESTE;2/3;0;0;90
+12/02/2024;FULANO;1234;Loja;Estorno LOJA;Única;0;0;-5
+"""
+
+OFX = """OFXHEADER:100
+<OFX><CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240305120000[-3:BRT]
+<TRNAMT>-40.00
+<MEMO>NETFLIX.COM
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240310
+<TRNAMT>-30.00
+<MEMO>LOJA TESTE - Parcela 1/2
+</STMTTRN>
+</BANKTRANLIST></CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>
+"""
+
+
+def test_csv_and_ofx_bills_are_read_into_the_bill_schema(tmp_path):
+    make_bills(tmp_path, ['2024-02-01'])
+    (tmp_path / 'Fatura_2024_02.cache').unlink()
+    (tmp_path / 'Fatura_2024_02.csv').write_text(CSV, encoding='utf-8')
+    (tmp_path / 'Fatura_2024_03.ofx').write_text(OFX, encoding='latin-1')
+
+    files = Files(str(tmp_path))
+    # The CSV export is preferred over the PDF of the same month
+    assert [f.file.name for f in files] == ['Fatura_2024_02.csv', 'Fatura_2024_03.ofx']
+
+    files.process('secret')
+    february, march = files
+    assert february._df.valor.tolist() == [25.9, 90.0, -5.0]
+    assert february._df.parcela.tolist() == [0, 2, 0]
+    assert february._df.parcelas_totais.tolist() == [0, 3, 0]
+    assert march._df.valor.tolist() == [40.0, 30.0]
+    assert march._df.parcelas_totais.tolist() == [0, 2]
+    assert march._df.data.tolist() == [pd.Timestamp('2024-03-05'), pd.Timestamp('2024-03-10')]
+
+
+def test_refunds_are_credits_whatever_their_sign():
+    # PDF bills print refunds as positive values, CSV exports as negative ones
+    df = pd.DataFrame({'local': ['Estorno LOJA', 'Estorno LOJA', 'LOJA'], 'valor': [5.0, -5.0, 5.0]})
+    assert readers_module._standardize(df).valor.tolist() == [-5.0, -5.0, 5.0]
+
+
+def test_files_without_a_month_in_the_name_are_skipped(tmp_path):
+    make_bills(tmp_path, ['2024-02-01'])
+    (tmp_path / 'gastos.csv').write_text(CSV, encoding='utf-8')
+    (tmp_path / 'notas.pdf').write_bytes(b'%PDF-1.4')
+
+    assert [f.file.name for f in Files(str(tmp_path))] == ['Fatura_2024_02.pdf']
+
+
+def test_recorded_extractor_replays_tabula_tables(tmp_path):
+    pages = [
+        [['resumo'], [1]],
+        [['01 jan', 'IFOOD*REST', None, '10,00'], ['02 fev', 'LOJA - Parcela 2/3', None, '1.234,50']],
+        [['rodape'], [1]],
+    ]
+    pdf = tmp_path / 'Fatura_2024_03.pdf'
+    pdf.write_bytes(b'%PDF-1.4')
+    pdf.with_suffix('.pages.json').write_text(json.dumps(pages))
+
+    files = Files(str(tmp_path))
+    files.process(extractor='recorded')
+
+    assert files[-1]._df.valor.tolist() == [10.0, 1234.5]
+    assert files[-1]._df.local.tolist() == ['IFOODREST', 'LOJA']
+
+
+def test_text_extractor_reads_purchase_lines():
+    text = 'Vencimento 10 mar\n01 jan IFOOD*REST 10,00\n02 fev LOJA - Parcela 2/3 1.234,50\nTotal 1.244,50'
+    assert readers_module._text_rows(text) == [
+        ['01 jan', 'IFOOD*REST', '', '10,00'],
+        ['02 fev', 'LOJA - Parcela 2/3', '', '1.234,50'],
+    ]
+
+
+def test_text_extractor_keeps_summary_and_footer_when_recording(monkeypatch):
+    pypdf = pytest.importorskip('pypdf')
+
+    class Page:
+        def __init__(self, text):
+            self.text = text
+
+        def extract_text(self):
+            return self.text
+
+    pages = [Page('Vencimento 10 mar'), Page('01 jan IFOOD*REST 10,00\n02 fev LOJA 5,00'), Page('Total 15,00')]
+    monkeypatch.setattr(pypdf, 'PdfReader', lambda *args, **kwargs: type('Reader', (), {'pages': pages}))
+
+    assert [len(t) for t in readers_module._text_tables('bill.pdf')] == [1]
+    tables = list(readers_module._text_tables('bill.pdf', purchases_only=False))
+    assert [t.columns[0] for t in tables] == ['resumo', '01 jan', 'rodape']
+    # Replaying the recording drops them again
+    assert [len(t) for t in readers_module._purchase_tables(iter(tables))] == [1]
+
+
+def test_files_outside_the_window_are_skipped(tmp_path):
+    months = pd.date_range('2023-01-01', '2024-06-01', freq='MS').astype(str)
+    make_bills(tmp_path, months)
+
+    files = Files(str(tmp_path))
+    assert len(files) == 12
+    assert files[0].month == date(2023, 7, 1)
+
+    files = Files(str(tmp_path), since=date(2023, 11, 15), until=date(2024, 2, 1))
+    assert [f.month.month for f in files] == [11, 12, 1, 2]
+
+    with pytest.raises(Exception):
+        Files(str(tmp_path), since=date(2025, 1, 1))
+
+
+def test_feather_cache_is_converted_and_memory_mapped(tmp_path):
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01'])
+    expected = Files(str(tmp_path))
+    expected.process('secret')
+
+    files = Files(str(tmp_path), cache='feather-lz4')
+    files.process('secret')
+
+    assert (tmp_path / 'Fatura_2024_02.lz4.feather').is_file()
+    assert isinstance(files[-1]._df.valor.dtype, pd.ArrowDtype)
+    assert files[-1]._df.valor.tolist() == expected[-1]._df.valor.tolist()
+    assert files.summary_all().equals(expected.summary_all())
+
+    # Each compression has its own file, so switching back does not reuse lz4
+    files = Files(str(tmp_path), cache='feather')
+    files.process('secret')
+    assert (tmp_path / 'Fatura_2024_02.feather').is_file()
+    assert files[-1]._df.valor.tolist() == expected[-1]._df.valor.tolist()
+
+
+def test_removed_rows_are_cut_out_of_the_memory_mapped_columns(tmp_path):
+    make_bills(tmp_path, ['2024-02-01'])
+    mapping_file = tmp_path / 'mapping.json'
+    mapping_file.write_text(json.dumps({'mapping': {'remove': ['netflix']}}))
+    f = File(tmp_path / 'Fatura_2024_02.pdf', date(2024, 2, 1), 'feather')
+    f.load()
+    f.classify(Mapping(mapping_file))
+
+    assert f._df.local.tolist() == ['IFOOD RESTAURANTE', 'LOJA TESTE']
+    assert f._df.valor.tolist() == [10.0, 90.0]
+    assert f._removed.local.tolist() == ['NETFLIX']
+    # The kept runs are chained as they are instead of filtered into a copy
+    assert pa.array(f._df.valor.array).num_chunks == 2
+
+
+def test_remap_reclassifies_only_changed_merchants(tmp_path):
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01'])
+    rules = {'rename': {'ifood': ['ifood']}, 'mapping': {'comida': ['ifood']}}
+    mapping_file = tmp_path / 'mapping.json'
+    mapping_file.write_text(json.dumps(rules))
+    files = Files(str(tmp_path))
+    files.process('secret', Mapping(mapping_file))
+    assert len(files.merchants) == 3
+
+    rules['mapping']['streaming'] = ['netflix']
+    rules['mapping']['remove'] = ['loja']
+    mapping_file.write_text(json.dumps(rules))
+    assert files.remap(Mapping(mapping_file)) == 2
+
+    assert files[-1]._df.set_index('local').type.to_dict() == {'IFOOD': 'comida', 'NETFLIX': 'streaming'}
+    by_type = files.cube.rollup('type').set_index('type').tot_value.to_dict()
+    assert by_type == {'streaming': 80.0, 'comida': 21.0}
+    assert len(files.ledger) == 0
+
+    # Bringing a removed merchant back restores its rows
+    del rules['mapping']['remove']
+    mapping_file.write_text(json.dumps(rules))
+    assert files.remap(Mapping(mapping_file)) == 1
+    assert files.cube.rollup('type').set_index('type').tot_value.to_dict()['others'] == 180.0
+
+    # The lookup is persisted with its rules, so a new session reclassifies nothing
+    files = Files(str(tmp_path))
+    assert files.merchants.invalidate(Mapping(mapping_file)).empty
+
+
+def test_mapping_is_loaded_lazily(tmp_path):
+    mapping_file = tmp_path / 'mapping.json'
+    mapping = Mapping(mapping_file)  # nothing is read yet
+
+    mapping_file.write_text(json.dumps({'rename': {}, 'mapping': {'comida': ['ifood']}}))
+    assert mapping._mapping == {'comida': 'ifood'}
+    assert not mapping.modified()
+
+    mapping_file.write_text(json.dumps({'rename': {}, 'mapping': {'comida': ['ifood', 'rappi']}}))
+    assert mapping.modified()
+    assert Mapping(mapping_file)._mapping == {'comida': 'ifood|rappi'}
+
+
+def test_mapping_layers_are_merged_with_precedence(tmp_path):
+    company = tmp_path / 'company.json'
+    company.write_text(json.dumps({
+        'rename': {'ifood': ['ifood']},
+        'mapping': {'comida': ['ifood', 'padaria'], 'mercado': ['carrefour']},
+    }))
+    personal = tmp_path / 'personal.json'
+    personal.write_text(json.dumps({
+        'rename': {},
+        'mapping': {'mercado': ['padaria'], 'streaming': ['netflix']},
+    }))
+
+    mapping = Mapping([company, personal])
+    assert mapping._mapping == {
+        'comida': 'ifood',
+        'mercado': 'carrefour|padaria',
+        'streaming': 'netflix',
+    }
+
+    data = pd.DataFrame({'local': ['IFOOD SP', 'PADARIA REAL', 'NETFLIX', 'LOJA'], 'type': None})
+    classified = data.pipe(mapping.rename).pipe(mapping.classify)
+    assert classified.type.tolist() == ['comida', 'mercado', 'streaming', 'others']
+    assert classified.local.tolist() == ['IFOOD', 'PADARIA REAL', 'NETFLIX', 'LOJA']
+
+
+def test_mapping_match_indexes_by_merchant_name():
+    names = ['IFOOD SP', 'UBER TRIP', 'LOJA TESTE']
+    matched = Mapping().match(names)
+
+    assert matched.index.tolist() == names
+    assert matched.loc['IFOOD SP', 'local'] == 'IFOOD'
+    assert matched.loc['LOJA TESTE'].tolist() == ['LOJA TESTE', 'others']
+
+
+def test_cards_are_joined_into_one_store_and_reported_apart(tmp_path):
+    for card, months in [('ana', ['2024-01-01', '2024-02-01']), ('bia', ['2024-02-01'])]:
+        (tmp_path / card).mkdir()
+        make_bills(tmp_path / card, months)
+
+    cards = {'ana': str(tmp_path / 'ana'), 'bia': str(tmp_path / 'b*')}
+    files = Files(str(tmp_path), cards=cards)
+    assert len(files) == 2
+    files.process('secret', workers=2)
+
+    assert sorted(files[-1]._df.card.unique()) == ['ana', 'bia']
+    assert files.summary_all().tot_value.tolist() == [281.0, 140.0]
+    assert len(files.ledger) == 3
+    assert (tmp_path / 'cube.cache').is_file()
+
+    ana, bia = files.by_card().values()
+    assert [f.month.month for f in ana] == [1, 2]
+    assert [f.month.month for f in bia] == [2]
+    assert bia[-1]._df.valor.tolist() == [10.0, 40.0, 90.0]
+    assert bia.summary_all().tot_value.tolist() == [140.0]
+    assert len(bia.ledger) == 1
+
+
+def test_folders_are_read_as_they_are_named(tmp_path):
+    folder = tmp_path / 'faturas [2024]'
+    folder.mkdir()
+    make_bills(folder, ['2024-01-01', '2024-02-01'])
+
+    files = Files(str(folder))
+    assert [f.month.month for f in files] == [1, 2]
+
+
+def test_the_card_is_shown_only_with_several_cards(tmp_path):
+    from c6_credit_card.services import report_data
+
+    for card in ('ana', 'bia'):
+        (tmp_path / card).mkdir()
+        make_bills(tmp_path / card, ['2024-02-01'])
+
+    files = Files(str(tmp_path / 'ana'))
+    files.process('secret')
+    data = report_data(files, html=False)
+    assert 'card' not in data['segments']['avista'].data
+    assert all('card' not in result.data for result in data['top_by_type'].values())
+
+    files = Files(str(tmp_path), cards={'ana': str(tmp_path / 'ana'), 'bia': str(tmp_path / 'bia')})
+    files.process('secret')
+    assert 'card' in report_data(files, html=False)['segments']['avista'].data
+
+
+def test_history_matches_runs_stopping_at_each_month(tmp_path):
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01', '2024-03-01', '2024-04-01'])
+    files = Files(str(tmp_path))
+    files.process('secret')
+    expected = Files(str(tmp_path), until=date(2024, 2, 1))
+    expected.process('secret')
+
+    february = list(files.history())[1]
+    assert february[-1] is files[1]
+    assert february.summary_all().equals(expected.summary_all())
+    assert february.ledger.open().equals(expected.ledger.open())
+    assert february.ledger.remaining().data.equals(expected.ledger.remaining().data)
@@ -0,0 +1,81 @@
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from c6_credit_card.data.file import File
+from c6_credit_card.data.ledger import Ledger
+
+
+def make_bill(month, rows):
+    file = File(Path(f"Fatura_{month:%Y_%m}.pdf"), month)
+    file._df = pd.DataFrame(
+        rows, columns=['local', 'valor', 'parcela', 'parcelas_totais', 'type']
+    )
+    file._df['parcelas_faltantes'] = file._df.parcelas_totais - file._df.parcela
+    return file
+
+
+def test_ledger_links_installments_across_bills():
+    ledger = Ledger()
+    ledger.ingest(make_bill(datetime(2024, 1, 1), [
+        ('LOJA', 100.0, 1, 3, 'shopping'),
+        ('LOJA', 100.0, 1, 3, 'shopping'),  # same purchase made twice
+        ('CURSO', 50.0, 2, 2, 'outros'),
+        ('IFOOD', 10.0, 0, 0, 'comida'),
+    ]))
+    ledger.ingest(make_bill(datetime(2024, 2, 1), [
+        ('LOJA', 100.0, 2, 3, 'shopping'),
+        ('LOJA', 100.0, 2, 3, 'shopping'),
+        ('TV', 30.0, 1, 2, 'casa'),
+    ]))
+
+    assert len(ledger) == 4  # two LOJA purchases, CURSO and TV
+    open_ = ledger.open()
+    assert sorted(open_.local) == ['LOJA', 'LOJA', 'TV']
+    assert open_.remaining.tolist() == [1, 1, 1]
+    assert open_.last_parcela.tolist() == [2, 2, 1]
+
+    remaining = ledger.remaining('type').data.set_index('type')
+    assert remaining.loc['shopping', 'remaining_value'] == 200.0
+    assert remaining.loc['casa', 'remaining_value'] == 30.0
+
+    # As of the first bill both LOJA purchases still had two installments to go
+    assert ledger.open(datetime(2024, 1, 1)).remaining.tolist() == [2, 2]
+
+
+def test_installments_differing_by_a_cent_stay_linked():
+    ledger = Ledger()
+    ledger.ingest(make_bill(datetime(2024, 1, 1), [
+        ('LOJA', 33.34, 1, 3, 'shopping'),
+        ('LOJA', 90.0, 1, 3, 'shopping'),  # another purchase at the same store
+    ]))
+    ledger.ingest(make_bill(datetime(2024, 2, 1), [
+        ('LOJA', 90.0, 2, 3, 'shopping'),
+        ('LOJA', 33.33, 2, 3, 'shopping'),
+    ]))
+
+    assert len(ledger) == 2
+    open_ = ledger.open().sort_values('valor')
+    assert open_.valor.tolist() == [33.33, 90.0]
+    assert open_.remaining.tolist() == [1, 1]
+
+
+def test_installments_missing_from_the_latest_bill_are_closed():
+    ledger = Ledger()
+    ledger.ingest(make_bill(datetime(2024, 1, 1), [
+        ('LOJA', 100.0, 1, 6, 'shopping'),
+        ('CURSO', 50.0, 1, 6, 'outros'),
+    ]))
+    # The LOJA purchase was prepaid after the first installment
+    ledger.ingest(make_bill(datetime(2024, 2, 1), [
+        ('CURSO', 50.0, 2, 6, 'outros'),
+    ]))
+
+    assert ledger.open().local.tolist() == ['CURSO']
+    assert len(ledger) == 2
+    # Bills of other cards do not close it
+    other = make_bill(datetime(2024, 3, 1), [('TV', 30.0, 1, 2, 'casa')])
+    other._df['card'] = 'bia'
+    ledger.ingest(other)
+    assert sorted(ledger.open().local) == ['CURSO', 'TV']
@@ -11,10 +11,11 @@ from c6_credit_card.__main__ import main as cli_main
 @pytest.fixture
 def mock_services():
     """Mocks all functions in services.py"""
-    with patch('c6_credit_card.__main__.read_files') as mock_read_files, \
-         patch('c6_credit_card.__main__.plot_next_months') as mock_plot_next_months, \
-         patch('c6_credit_card.__main__.plot_data_total') as mock_plot_data_total, \
-         patch('c6_credit_card.__main__.plot_data_type') as mock_plot_data_type:
+    with patch('c6_credit_card.services.read_files') as mock_read_files, \
+         patch('c6_credit_card.services.plot_next_months') as mock_plot_next_months, \
+         patch('c6_credit_card.services.plot_data_total') as mock_plot_data_total, \
+         patch('c6_credit_card.services.plot_data_type') as mock_plot_data_type, \
+         patch('c6_credit_card.services.report_data') as mock_report_data:
         
         # Setup default return values for mocks
         # Mock read_files to return a mock Files object which has a mock File item
@@ -29,19 +30,21 @@ def mock_services():
         mock_plot_next_months.return_value = ([], []) # (ys, xs)
         mock_plot_data_total.return_value = ([], [])  # (ys, xs)
         mock_plot_data_type.return_value = ([], [], []) # (ys, xs, tps)
+        mock_report_data.side_effect = lambda files, *args, **kwargs: {"file": files[-1]}
         
         yield {
             "read_files": mock_read_files,
             "plot_next_months": mock_plot_next_months,
             "plot_data_total": mock_plot_data_total,
             "plot_data_type": mock_plot_data_type,
+            "report_data": mock_report_data,
         }
 
 @pytest.fixture
 def mock_output_functions():
     """Mocks functions in output.py"""
-    with patch('c6_credit_card.__main__.display_terminal_output') as mock_display_terminal, \
-         patch('c6_credit_card.__main__.generate_html_output') as mock_generate_html:
+    with patch('c6_credit_card.output.display_terminal_output') as mock_display_terminal, \
+         patch('c6_credit_card.output.generate_html_output') as mock_generate_html:
         
         mock_generate_html.return_value = "<html>Mocked HTML Output</html>"
         
@@ -51,24 +54,30 @@ def mock_output_functions():
         }
 
 def test_cli_basic_invocation(mock_services, mock_output_functions):
-    """Test basic CLI invocation with default (terminal) output."""
+    """Test basic CLI invocation with terminal output."""
     runner = CliRunner()
     # Provide a dummy path for '-p' option as it's required
-    result = runner.invoke(cli_main, ['-p', 'dummy_path']) 
-    
+    result = runner.invoke(cli_main, ['-p', 'dummy_path', '-o', 'terminal'])
+
     assert result.exit_code == 0
-    mock_services["read_files"].assert_called_once_with('dummy_path', False) # force=False
+    mock_services["read_files"].assert_called_once()
+    kwargs_read_files = mock_services["read_files"].call_args[1]
+    assert kwargs_read_files['pasta'] == 'dummy_path'
+    assert kwargs_read_files['force'] is False
     mock_output_functions["display_terminal"].assert_called_once()
     mock_output_functions["generate_html"].assert_not_called()
+    # The daily series are only computed for the html report
+    assert mock_services["report_data"].call_args[1]['html'] is False
 
-def test_cli_html_output(mock_services, mock_output_functions):
+def test_cli_html_output(mock_services, mock_output_functions, tmp_path, monkeypatch):
     """Test CLI with --output-format html."""
+    monkeypatch.chdir(tmp_path)  # the report is written to the working directory
     runner = CliRunner()
     result = runner.invoke(cli_main, ['-p', 'dummy_path', '--output-format', 'html'])
-    
+
     assert result.exit_code == 0
-    assert "<html>Mocked HTML Output</html>" in result.output # Check if HTML printout is there
-    mock_services["read_files"].assert_called_once_with('dummy_path', False)
+    assert (tmp_path / 'report.html').read_text() == "<html>Mocked HTML Output</html>"
+    assert mock_services["read_files"].call_args[1]['pasta'] == 'dummy_path'
     mock_output_functions["generate_html"].assert_called_once()
     mock_output_functions["display_terminal"].assert_not_called()
 
@@ -87,32 +96,116 @@ def test_cli_invalid_output_format():
     assert result.exit_code != 0 # Expecting failure
     assert "Invalid value for '--output-format' / '-o'" in result.output # Click's error message
 
-def test_cli_index_option(mock_services, mock_output_functions):
-    """Test CLI with --index option."""
+def test_cli_until_option(mock_services, mock_output_functions):
+    """Test CLI with --until, which picks the last bill read."""
     runner = CliRunner()
-    # Assume read_files returns a list-like object that can be indexed
     mock_file_item1 = MagicMock()
     mock_file_item1.path.name = "file1.pdf"
     mock_file_item2 = MagicMock()
     mock_file_item2.path.name = "file2.pdf"
-    
+
     mock_files_obj = MagicMock()
     # Make it behave like a list for __getitem__
     mock_files_obj.__getitem__.side_effect = lambda idx: [mock_file_item1, mock_file_item2][idx]
     mock_services["read_files"].return_value = mock_files_obj
 
-    result = runner.invoke(cli_main, ['-p', 'dummy_path', '-i', '2']) # User provides 1-based index
-    
+    result = runner.invoke(cli_main, ['-p', 'dummy_path', '--until', '2024-02', '-o', 'terminal'])
+
     assert result.exit_code == 0
-    # Check that the correct file (index 1 because user passes 2) was processed.
-    # display_terminal_output is called with keyword arguments.
+    assert mock_services["read_files"].call_args[1]['until'].strftime('%Y-%m') == '2024-02'
+    # The report is made for the last file read
     kwargs_display_terminal = mock_output_functions["display_terminal"].call_args[1]
     assert kwargs_display_terminal['file'] == mock_file_item2
 
-    # plot_next_months is called with file as the first positional argument.
-    pos_args_plot_next = mock_services["plot_next_months"].call_args[0]
-    assert pos_args_plot_next[0] == mock_file_item2
-
 # More tests could include: verbose flag, force flag.
 # Testing the actual setup() function call might be complex if it has side effects like logging.
 # For now, the mocks bypass deep interaction with setup.
+
+def test_cli_query_subcommand(tmp_path):
+    """The query subcommand reads the cached bills directly."""
+    from tests.test_cube import make_bills
+
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01', '2024-03-01'])
+    runner = CliRunner()
+    result = runner.invoke(cli_main, [
+        '-p', str(tmp_path), 'query', '-l', 'ifood', '--since', '2024-02', '--min', '11.5', '--csv'
+    ])
+
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0].startswith('"month","data","local","valor"')
+    assert '"card"' not in lines[0]  # a single card is not labelled
+    assert len(lines) == 2  # only March (valor 12) is above the minimum from February on
+    assert '"IFOOD RESTAURANTE",12' in lines[1]
+
+    result = runner.invoke(cli_main, ['-p', str(tmp_path), 'query', '-b', 'local', '--top', '1', '--csv'])
+    assert result.exit_code == 0
+    # Installment suffixes are dropped before grouping
+    assert result.output.splitlines()[1] == '"LOJA TESTE",3,270'
+
+
+def test_cli_query_scans_every_card(tmp_path):
+    from tests.test_cube import make_bills
+
+    for card, months in [('ana', ['2024-01-01', '2024-02-01']), ('bia', ['2024-02-01'])]:
+        (tmp_path / card).mkdir()
+        make_bills(tmp_path / card, months)
+
+    runner = CliRunner()
+    result = runner.invoke(cli_main, [
+        '-p', str(tmp_path), '-c', str(tmp_path / '*'), 'query', '-b', 'card', '--csv'
+    ])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[1:] == ['"ana",6,281', '"bia",3,140']
+
+
+def test_cli_choices_match_the_package():
+    """The CLI mirrors these constants so it can start without pandas."""
+    from c6_credit_card import __main__
+    from c6_credit_card.data.file import CACHES
+    from c6_credit_card.data.readers import EXTRACTORS
+    from c6_credit_card.output import ASSETS
+    from c6_credit_card.services import MAX_POINTS
+
+    assert __main__.CACHES == list(CACHES)
+    assert __main__.EXTRACTORS == list(EXTRACTORS)
+    assert __main__.ASSETS == ASSETS
+    assert __main__.MAX_POINTS == MAX_POINTS
+
+
+def test_cli_starts_without_pandas():
+    import subprocess
+    import sys
+
+    code = 'import sys, c6_credit_card.__main__; print("pandas" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert result.stdout.strip() == 'False'
+
+
+def test_cli_record_subcommand(tmp_path, monkeypatch):
+    """Bills recorded by the CLI are replayed by the recorded extractor."""
+    import pandas as pd
+
+    import c6_credit_card.data.readers as readers_module
+    from c6_credit_card.data.files import Files
+
+    tables = [
+        pd.DataFrame({'resumo': [1]}),
+        pd.DataFrame([['02 jan', 'IFOOD*REST', '', '10,00']], columns=['01 jan', 'LOJA', '', '5,00']),
+        pd.DataFrame({'rodape': [1]}),
+    ]
+    monkeypatch.setattr(readers_module, 'read_pdf', lambda *args, **kwargs: list(tables))
+    monkeypatch.setenv('password', 'secret')
+    (tmp_path / 'Fatura_2024_03.pdf').write_bytes(b'%PDF-1.4')
+
+    runner = CliRunner()
+    result = runner.invoke(cli_main, ['-p', str(tmp_path), 'record'])
+    assert result.exit_code == 0
+    assert (tmp_path / 'Fatura_2024_03.pages.json').is_file()
+
+    files = Files(str(tmp_path))
+    files.process(extractor='recorded')
+    assert files[-1]._df.valor.tolist() == [5.0, 10.0]
+
+    result = runner.invoke(cli_main, ['-p', str(tmp_path), '-e', 'recorded', 'record'])
+    assert result.exit_code != 0
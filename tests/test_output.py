@@ -191,3 +191,132 @@ def test_generate_html_output_data_presence(sample_file_data):
     # and this _df becomes .data via the property
     assert "<td>10</td>" in html_content # from tot_avista.top(10).data.to_html() or similar
     assert "<td>20</td>" in html_content # from tot_avista.top(10).data.to_html() or similar
+
+
+def test_generate_parcelas_breakdown_table_order():
+    from c6_credit_card.data.result import Result
+    from c6_credit_card.output import generate_parcelas_breakdown_table
+
+    def segment(faltantes, totais, valor):
+        return Result(pd.DataFrame({
+            'parcelas_faltantes': faltantes, 'parcelas_totais': totais, 'valor': valor
+        }))
+
+    segments = {
+        'avista': segment([0, 0], [0, 0], [10.0, 5.0]),
+        'parcelados': segment([10, 2, 2], [12, 3, 4], [1.0, 2.0, 3.0]),
+        'finalizados': segment([0], [3], [7.0]),
+        'recorrente': segment([0], [0], [99.0]),
+    }
+
+    html = generate_parcelas_breakdown_table(segments)
+
+    labels = ['À vista', '0 restantes', '2 restantes', '10 restantes']
+    positions = [html.index(f"<td>{label}</td>") for label in labels]
+    assert positions == sorted(positions)
+    assert "R$ 15.00" in html  # à vista
+    assert "R$ 5.00" in html  # 2 restantes
+    assert "R$ 99.00" not in html  # recorrentes are left out
+
+
+def test_assets_are_written_once_and_linked_or_inlined(tmp_path):
+    from plotly.offline import get_plotlyjs_version
+
+    from c6_credit_card.output import CSS, PLOTLY_CDN, PLOTLY_JS, _head, write_assets
+
+    assets = write_assets(tmp_path)
+    bundle = assets / PLOTLY_JS
+    assert (assets / 'report.css').read_text() == CSS
+    mtime = bundle.stat().st_mtime_ns
+    write_assets(tmp_path)
+    assert bundle.stat().st_mtime_ns == mtime
+
+    shared = _head('shared')
+    assert f'src="assets/{PLOTLY_JS}"' in shared and 'href="assets/report.css"' in shared
+    assert PLOTLY_JS == f'plotly-{get_plotlyjs_version()}.min.js'
+    assert PLOTLY_CDN in _head('cdn') and PLOTLY_CDN.endswith(PLOTLY_JS)
+    assert 'cdn.plot.ly/plotly' not in _head('inline')
+    assert CSS in _head('inline') and CSS in _head('cdn')
+    with pytest.raises(Exception):
+        _head('offline')
+
+
+def test_reports_are_rendered_from_plain_payloads(tmp_path):
+    from c6_credit_card.data.files import Files
+    from c6_credit_card.output import html_payload, render_html
+    from c6_credit_card.services import report_data
+    from tests.test_cube import make_bills
+
+    make_bills(tmp_path, ['2024-01-01', '2024-02-01'])
+    files = Files(str(tmp_path))
+    files.process('secret')
+    data = report_data(files, history=True)
+    payload = html_payload(**data)
+
+    # The page is built from strings, numbers and chart series, not the bills
+    assert all(isinstance(v, (str, int, float, dict, list)) for v in payload.values())
+    assert render_html(**payload, assets='inline') == generate_html_output(**data, assets='inline')
+
+
+def test_transactions_are_embedded_as_columnar_json():
+    import json
+    import re
+
+    from c6_credit_card.output import generate_transactions_table
+
+    transactions = pd.DataFrame({
+        'month': pd.to_datetime(['2024-02-01', '2024-02-01', '2024-01-01']),
+        'local': ['IFOOD', '</script>', 'IFOOD'],
+        'valor': [10.456, 20.0, 5.0],
+        'parcela': [0, 1, 0],
+    })
+    html = generate_transactions_table(transactions)
+
+    payload = re.search(r'type="application/json">(.*?)</script>', html, re.S).group(1)
+    data = json.loads(payload)['data']
+    assert data['month'] == {'codes': [0, 0, 1], 'values': ['2024-02', '2024-01']}
+    assert data['local'] == {'codes': [0, 1, 0], 'values': ['IFOOD', '</script>']}
+    assert data['valor'] == [10.46, 20.0, 5.0]
+    assert data['parcela'] == [0, 1, 0]
+    assert '<td>IFOOD' not in html
+
+
+def test_df_to_table_formats_columns_without_touching_the_frame():
+    from c6_credit_card.data.result import Result
+
+    data = pd.DataFrame({
+        'local': ['A', 'B', 'C'],
+        'valor': [1234.5, float('nan'), 3.0],
+        'data': pd.to_datetime(['2024-05-01', '2024-05-02', '2024-05-03']),
+        'parcelas_totais': [0, 2, 0],
+    })
+    before = data.copy()
+
+    table = Result(data).print(max_rows=2)
+
+    assert data.equals(before)
+    assert [c.header for c in table.columns] == ['data', 'local', 'valor']
+    assert table.row_count == 2
+    assert list(table.columns[0].cells) == ['01/05', '02/05']
+    assert list(table.columns[2].cells) == ['R$ 1,234.50', '']
+    # Only money columns are shown in reais
+    share = Result(pd.DataFrame({'type': ['a'], 'share': [1234.5]})).print()
+    assert list(share.columns[1].cells) == ['1,234.50']
+    assert Result(data).top(2).data.index.tolist() == [0, 1]
+
+
+def test_df_to_table_formats_long_columns_like_str_format():
+    import numpy as np
+    from c6_credit_card.data.result import Result
+
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.normal(0, 1e4, 5000),
+        rng.integers(-10**6, 10**6, 5000) / 1000,  # half cents
+        [float('nan'), -0.001, -0.0, 0.125, 1.005, 2.675, 999.995, 1e12 + 0.5],
+    ])
+    table = Result(pd.DataFrame({'valor': values, 'share': values})).print()
+
+    expected = ['' if np.isnan(v) else '{:,.2f}'.format(v) for v in values]
+    assert list(table.columns[0].cells) == ['' if not e else f'R$ {e}' for e in expected]
+    assert list(table.columns[1].cells) == expected